@@ -0,0 +1,52 @@
+"""store index_records embeddings as float32 blobs
+
+Revision ID: 0002_embedding_blob
+Revises: 0001_create_tables
+Create Date: 2026-10-18 00:00:00
+
+Existing rows keep `embedding_json` until `python -m app.backfill` converts them.
+"""
+
+import json
+from array import array
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002_embedding_blob"
+down_revision = "0001_create_tables"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("index_records") as batch:
+        batch.add_column(sa.Column("embedding_blob", sa.LargeBinary(), nullable=True))
+        batch.alter_column("embedding_json", existing_type=sa.Text(), nullable=True)
+
+
+def downgrade() -> None:
+    index_records = sa.table(
+        "index_records",
+        sa.column("chunk_id", sa.String()),
+        sa.column("embedding_json", sa.Text()),
+        sa.column("embedding_blob", sa.LargeBinary()),
+    )
+    conn = op.get_bind()
+    rows = conn.execute(
+        sa.select(index_records.c.chunk_id, index_records.c.embedding_blob).where(
+            index_records.c.embedding_json.is_(None)
+        )
+    ).fetchall()
+    for chunk_id, blob in rows:
+        # Blobs are little-endian float32, which is array("f") on supported hosts.
+        vector = array("f", bytes(blob)).tolist() if blob else []
+        conn.execute(
+            index_records.update()
+            .where(index_records.c.chunk_id == chunk_id)
+            .values(embedding_json=json.dumps(vector))
+        )
+    with op.batch_alter_table("index_records") as batch:
+        batch.alter_column("embedding_json", existing_type=sa.Text(), nullable=False)
+        batch.drop_column("embedding_blob")
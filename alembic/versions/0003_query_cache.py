@@ -0,0 +1,29 @@
+"""create shared query cache table
+
+Revision ID: 0003_query_cache
+Revises: 0002_embedding_blob
+Create Date: 2026-10-18 00:00:00
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003_query_cache"
+down_revision = "0002_embedding_blob"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "query_cache",
+        sa.Column("cache_key", sa.String(), primary_key=True),
+        sa.Column("payload_json", sa.Text(), nullable=False),
+        sa.Column("expires_at", sa.Float(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("query_cache")
@@ -0,0 +1,29 @@
+"""create embedding cache table
+
+Revision ID: 0004_embedding_cache
+Revises: 0003_query_cache
+Create Date: 2026-10-18 00:00:00
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004_embedding_cache"
+down_revision = "0003_query_cache"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "embedding_cache",
+        sa.Column("cache_key", sa.String(), primary_key=True),
+        sa.Column("embedding_blob", sa.LargeBinary(), nullable=False),
+        sa.Column("created_at_utc", sa.String(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("embedding_cache")
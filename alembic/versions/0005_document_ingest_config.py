@@ -0,0 +1,32 @@
+"""record ingest configuration on documents for upload dedup
+
+Revision ID: 0005_document_ingest_config
+Revises: 0004_embedding_cache
+Create Date: 2026-10-18 00:00:00
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005_document_ingest_config"
+down_revision = "0004_embedding_cache"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("documents") as batch:
+        batch.add_column(sa.Column("parser_mode", sa.String(), nullable=True))
+        batch.add_column(sa.Column("chunk_size", sa.Integer(), nullable=True))
+        batch.add_column(sa.Column("chunk_overlap", sa.Integer(), nullable=True))
+        batch.add_column(sa.Column("index_version", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("documents") as batch:
+        batch.drop_column("index_version")
+        batch.drop_column("chunk_overlap")
+        batch.drop_column("chunk_size")
+        batch.drop_column("parser_mode")
@@ -0,0 +1,36 @@
+"""create ingestion jobs table
+
+Revision ID: 0006_ingestion_jobs
+Revises: 0005_document_ingest_config
+Create Date: 2026-10-18 00:00:00
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006_ingestion_jobs"
+down_revision = "0005_document_ingest_config"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ingestion_jobs",
+        sa.Column("job_id", sa.String(), primary_key=True),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("doc_id", sa.String(), nullable=False),
+        sa.Column("doc_name", sa.String(), nullable=False),
+        sa.Column("doc_sha256", sa.String(), nullable=False),
+        sa.Column("docs_snapshot_id", sa.String(), nullable=False),
+        sa.Column("storage_path", sa.String(), nullable=False),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("created_at_utc", sa.String(), nullable=False),
+        sa.Column("updated_at_utc", sa.String(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("ingestion_jobs")
@@ -0,0 +1,38 @@
+"""add secondary indexes for snapshot-scoped and time-windowed queries
+
+Revision ID: 0007_secondary_indexes
+Revises: 0006_ingestion_jobs
+Create Date: 2026-10-18 00:00:00
+
+"""
+
+from alembic import op
+
+
+revision = "0007_secondary_indexes"
+down_revision = "0006_ingestion_jobs"
+branch_labels = None
+depends_on = None
+
+
+_INDEXES = (
+    ("ix_chunks_docs_snapshot_id", "chunks", ["docs_snapshot_id"]),
+    ("ix_chunks_doc_id_page_num_chunk_index", "chunks", ["doc_id", "page_num", "chunk_index"]),
+    ("ix_index_records_docs_snapshot_id", "index_records", ["docs_snapshot_id"]),
+    ("ix_documents_doc_sha256_ingested_at_utc", "documents", ["doc_sha256", "ingested_at_utc"]),
+    ("ix_documents_ingested_at_utc_snapshot", "documents", ["ingested_at_utc", "docs_snapshot_id"]),
+    ("ix_telemetry_timestamp_utc", "telemetry", ["timestamp_utc"]),
+    ("ix_ingestion_jobs_status_created_at_utc", "ingestion_jobs", ["status", "created_at_utc"]),
+    ("ix_ingestion_jobs_doc_sha256_status", "ingestion_jobs", ["doc_sha256", "status"]),
+    ("ix_query_cache_expires_at", "query_cache", ["expires_at"]),
+)
+
+
+def upgrade() -> None:
+    for name, table, columns in _INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(_INDEXES):
+        op.drop_index(name, table_name=table)
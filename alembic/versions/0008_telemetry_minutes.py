@@ -0,0 +1,35 @@
+"""create telemetry_minutes rollup table
+
+Revision ID: 0008_telemetry_minutes
+Revises: 0007_secondary_indexes
+Create Date: 2026-10-18 00:00:00
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0008_telemetry_minutes"
+down_revision = "0007_secondary_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "telemetry_minutes",
+        sa.Column("minute_utc", sa.String(), primary_key=True),
+        sa.Column("worker_id", sa.String(), primary_key=True),
+        sa.Column("request_count", sa.Integer(), nullable=False),
+        sa.Column("cost_sum", sa.Float(), nullable=False),
+        sa.Column("cache_hits", sa.Integer(), nullable=False),
+        sa.Column("refusals_json", sa.Text(), nullable=False),
+        sa.Column("latency_sketch", sa.Text(), nullable=False),
+        sa.Column("first_timestamp_utc", sa.String(), nullable=False),
+        sa.Column("last_timestamp_utc", sa.String(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("telemetry_minutes")
@@ -0,0 +1,36 @@
+"""add per-stage latency columns
+
+Revision ID: 0009_stage_latency
+Revises: 0008_telemetry_minutes
+Create Date: 2026-10-18 00:00:00
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0009_stage_latency"
+down_revision = "0008_telemetry_minutes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("telemetry", sa.Column("stage_latency_json", sa.Text(), nullable=True))
+    op.add_column("ingestion_jobs", sa.Column("stage_latency_json", sa.Text(), nullable=True))
+    with op.batch_alter_table("telemetry_minutes") as batch:
+        batch.add_column(sa.Column("stage_sketches_json", sa.Text(), nullable=True))
+        # Minutes with only upload/ingest stage timings have no request timestamps.
+        batch.alter_column("first_timestamp_utc", existing_type=sa.String(), nullable=True)
+        batch.alter_column("last_timestamp_utc", existing_type=sa.String(), nullable=True)
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM telemetry_minutes WHERE first_timestamp_utc IS NULL")
+    with op.batch_alter_table("telemetry_minutes") as batch:
+        batch.alter_column("last_timestamp_utc", existing_type=sa.String(), nullable=False)
+        batch.alter_column("first_timestamp_utc", existing_type=sa.String(), nullable=False)
+        batch.drop_column("stage_sketches_json")
+    op.drop_column("ingestion_jobs", "stage_latency_json")
+    op.drop_column("telemetry", "stage_latency_json")
@@ -0,0 +1,31 @@
+"""index index_records.doc_id and documents.docs_snapshot_id
+
+Revision ID: 0010_doc_id_indexes
+Revises: 0009_stage_latency
+Create Date: 2026-10-18 00:00:00
+
+"""
+
+from alembic import op
+
+
+revision = "0010_doc_id_indexes"
+down_revision = "0009_stage_latency"
+branch_labels = None
+depends_on = None
+
+
+_INDEXES = (
+    ("ix_index_records_doc_id", "index_records", ["doc_id"]),
+    ("ix_documents_docs_snapshot_id", "documents", ["docs_snapshot_id"]),
+)
+
+
+def upgrade() -> None:
+    for name, table, columns in _INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(_INDEXES):
+        op.drop_index(name, table_name=table)
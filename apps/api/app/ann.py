@@ -0,0 +1,125 @@
+"""IVF approximate nearest-neighbour index for the local vector path."""
+
+import os
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+
+CENTROIDS_FILE = "ivf_centroids.npy"
+OFFSETS_FILE = "ivf_offsets.npy"
+ROW_IDS_FILE = "ivf_row_ids.npy"
+
+_ASSIGN_BLOCK = 65536
+_TRAIN_POINTS_PER_LIST = 64
+_MAX_TRAIN_POINTS = 131072
+
+
+@dataclass
+class IVFIndex:
+    centroids: np.ndarray
+    offsets: np.ndarray
+    row_ids: np.ndarray
+
+    @property
+    def nlist(self) -> int:
+        return self.centroids.shape[0]
+
+    def search(
+        self, matrix: np.ndarray, queries: np.ndarray, k: int, nprobe: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Approximate top-k rows per query, shaped like `top_k_cosine` output.
+
+        Queries whose probed lists hold fewer than k rows are padded with
+        row id -1 and score -inf.
+        """
+        nprobe = max(1, min(nprobe, self.nlist))
+        out_rows = np.full((queries.shape[0], k), -1, dtype=np.int64)
+        out_scores = np.full((queries.shape[0], k), -np.inf, dtype=np.float32)
+        centroid_scores = queries @ self.centroids.T
+        probes = np.argpartition(-centroid_scores, nprobe - 1, axis=1)[:, :nprobe]
+        for q, lists in enumerate(probes):
+            candidates = np.concatenate(
+                [self.row_ids[self.offsets[i] : self.offsets[i + 1]] for i in lists]
+            )
+            if not candidates.size:
+                continue
+            scores = matrix[candidates] @ queries[q]
+            top = min(k, candidates.size)
+            best = np.argpartition(-scores, top - 1)[:top]
+            best = best[np.argsort(-scores[best], kind="stable")]
+            out_rows[q, :top] = candidates[best]
+            out_scores[q, :top] = scores[best]
+        return out_rows, out_scores
+
+
+def train_ivf(
+    matrix: np.ndarray, nlist: int, iterations: int = 10, seed: int = 0
+) -> IVFIndex:
+    """Train a spherical k-means quantizer on normalized rows and assign every row."""
+    n_rows = matrix.shape[0]
+    nlist = max(1, min(nlist, n_rows))
+    rng = np.random.default_rng(seed)
+    n_train = min(n_rows, max(nlist * _TRAIN_POINTS_PER_LIST, nlist), _MAX_TRAIN_POINTS)
+    sample = np.asarray(matrix[np.sort(rng.choice(n_rows, n_train, replace=False))])
+    centroids = sample[rng.choice(n_train, nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, sample)
+        counts = np.bincount(assign, minlength=nlist)
+        empty = counts == 0
+        if empty.any():
+            # Re-seed empty lists from random training points.
+            sums[empty] = sample[rng.choice(n_train, int(empty.sum()))]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = np.divide(sums, norms, out=sums, where=norms > 0)
+
+    assign = np.empty(n_rows, dtype=np.int64)
+    for start in range(0, n_rows, _ASSIGN_BLOCK):
+        block = np.asarray(matrix[start : start + _ASSIGN_BLOCK])
+        assign[start : start + block.shape[0]] = np.argmax(block @ centroids.T, axis=1)
+    row_ids = np.argsort(assign, kind="stable").astype(np.int64)
+    offsets = np.zeros(nlist + 1, dtype=np.int64)
+    np.cumsum(np.bincount(assign, minlength=nlist), out=offsets[1:])
+    return IVFIndex(centroids=centroids.astype(np.float32), offsets=offsets, row_ids=row_ids)
+
+
+def save_ivf(path: str, ivf: IVFIndex) -> None:
+    for name, array in (
+        (CENTROIDS_FILE, ivf.centroids),
+        (OFFSETS_FILE, ivf.offsets),
+        (ROW_IDS_FILE, ivf.row_ids),
+    ):
+        tmp_path = os.path.join(path, f"{name}.tmp")
+        with open(tmp_path, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp_path, os.path.join(path, name))
+
+
+def load_ivf(path: str, n_rows: int, dim: int) -> Optional[IVFIndex]:
+    """Map a persisted IVF index, or None if missing or built for other rows."""
+    try:
+        centroids = np.load(os.path.join(path, CENTROIDS_FILE))
+        offsets = np.load(os.path.join(path, OFFSETS_FILE))
+        row_ids = np.load(os.path.join(path, ROW_IDS_FILE), mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+    if (
+        centroids.ndim != 2
+        or centroids.shape[1] != dim
+        or offsets.shape[0] != centroids.shape[0] + 1
+        or row_ids.shape[0] != n_rows
+        or int(offsets[-1]) != n_rows
+    ):
+        return None
+    return IVFIndex(centroids=centroids, offsets=offsets, row_ids=row_ids)
+
+
+def remove_ivf(path: str) -> None:
+    for name in (CENTROIDS_FILE, OFFSETS_FILE, ROW_IDS_FILE):
+        try:
+            os.remove(os.path.join(path, name))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,31 @@
+"""Convert JSON-encoded index_records embeddings to float32 blobs."""
+
+import argparse
+import json
+
+from .db import load_unconverted_index_records, set_embedding_blobs
+from .embeddings import encode_embedding
+
+
+def backfill_embeddings(batch_size: int = 500) -> int:
+    converted = 0
+    while True:
+        rows = load_unconverted_index_records(batch_size)
+        if not rows:
+            return converted
+        set_embedding_blobs(
+            {row.chunk_id: encode_embedding(json.loads(row.embedding_json)) for row in rows}
+        )
+        converted += len(rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    converted = backfill_embeddings(args.batch_size)
+    print(f"Converted {converted} index record embeddings.")
+
+
+if __name__ == "__main__":
+    main()
@@ -26,10 +26,21 @@ INDEX_VERSION = _getenv("DOCQA_INDEX_VERSION", "v3.1.0")
 
 DATA_DIR = _getenv("DOCQA_DATA_DIR", "data")
 RAW_DIR = os.path.join(DATA_DIR, "raw")
+INDEX_DIR = os.path.join(DATA_DIR, "index")
 DATABASE_URL = _getenv("DB_DATABASE_URL", "")
+DB_POOL_SIZE = int(_getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(_getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_PRE_PING = _is_truthy(_getenv("DB_POOL_PRE_PING", "1"))
+DB_POOL_RECYCLE_S = int(_getenv("DB_POOL_RECYCLE_S", "1800"))
 
 CHUNK_SIZE = int(_getenv("DOCQA_CHUNK_SIZE", "900"))
 CHUNK_OVERLAP = int(_getenv("DOCQA_CHUNK_OVERLAP", "150"))
+INGEST_WORKERS = int(_getenv("DOCQA_INGEST_WORKERS", "2"))
+PARSE_WORKERS = int(_getenv("DOCQA_PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+PARSE_PARALLEL_MIN_PAGES = int(_getenv("DOCQA_PARSE_PARALLEL_MIN_PAGES", "32"))
+PARSE_POOL_IDLE_S = float(_getenv("DOCQA_PARSE_POOL_IDLE_S", "300"))
+INGEST_BATCH_SIZE = int(_getenv("DOCQA_INGEST_BATCH_SIZE", "256"))
+INGEST_JOB_LEASE_S = int(_getenv("DOCQA_INGEST_JOB_LEASE_S", "300"))
 
 CONF_MIN = float(_getenv("DOCQA_CONF_MIN", "0.35"))
 
@@ -37,6 +48,14 @@ TOP_K = int(_getenv("DOCQA_TOP_K", "5"))
 TOP_K_VECTOR = int(_getenv("DOCQA_TOP_K_VECTOR", "5"))
 TOP_K_BM25 = int(_getenv("DOCQA_TOP_K_BM25", "5"))
 RRF_K = int(_getenv("DOCQA_RRF_K", "60"))
+LOCAL_INDEX_CACHE_SIZE = int(_getenv("DOCQA_LOCAL_INDEX_CACHE_SIZE", "8"))
+IVF_MIN_ROWS = int(_getenv("DOCQA_IVF_MIN_ROWS", "200000"))
+IVF_NLIST = int(_getenv("DOCQA_IVF_NLIST", "0"))
+IVF_NPROBE = int(_getenv("DOCQA_IVF_NPROBE", "16"))
+
+QUERY_CACHE_SIZE = int(_getenv("DOCQA_QUERY_CACHE_SIZE", "1024"))
+QUERY_CACHE_TTL_S = int(_getenv("DOCQA_QUERY_CACHE_TTL_S", "300"))
+QUERY_CACHE_SHARED = _is_truthy(_getenv("DOCQA_QUERY_CACHE_SHARED", "0"))
 
 _embeddings_local = _getenv("EMBEDDINGS_LOCAL")
 if _embeddings_local is not None:
@@ -44,6 +63,14 @@ if _embeddings_local is not None:
 else:
     EMBEDDINGS_MODE = _getenv("EMBEDDINGS_MODE", "local")
 EMBEDDINGS_DIM = int(_getenv("EMBEDDINGS_DIM", "16"))
+EMBEDDING_CACHE_SIZE = int(_getenv("EMBEDDINGS_CACHE_SIZE", "4096"))
+EMBEDDING_CACHE_PERSIST = _is_truthy(_getenv("EMBEDDINGS_CACHE_PERSIST", "1"))
+EMBEDDINGS_BATCH_MAX_INPUTS = int(_getenv("EMBEDDINGS_BATCH_MAX_INPUTS", "64"))
+EMBEDDINGS_BATCH_MAX_TOKENS = int(_getenv("EMBEDDINGS_BATCH_MAX_TOKENS", "8000"))
+EMBEDDINGS_CONCURRENCY = int(_getenv("EMBEDDINGS_CONCURRENCY", "4"))
+EMBEDDINGS_MAX_RETRIES = int(_getenv("EMBEDDINGS_MAX_RETRIES", "5"))
+EMBEDDINGS_BACKOFF_S = float(_getenv("EMBEDDINGS_BACKOFF_S", "0.5"))
+EMBEDDINGS_TIMEOUT_S = float(_getenv("EMBEDDINGS_TIMEOUT_S", "30"))
 
 AZURE_OPENAI_ENDPOINT = _getenv("AZURE_OPENAI_ENDPOINT", "")
 AZURE_OPENAI_API_KEY = _getenv("AZURE_OPENAI_API_KEY", "")
@@ -61,6 +88,14 @@ AZURE_SEARCH_CREATE_INDEX = _is_truthy(_getenv("AZURE_SEARCH_CREATE_INDEX", "0")
 ENABLE_INDEXING = _is_truthy(_getenv("DOCQA_ENABLE_INDEXING", "1"))
 
 METRICS_ADMIN_TOKEN = _getenv("DOCQA_METRICS_ADMIN_TOKEN", "")
+TELEMETRY_QUEUE_SIZE = int(_getenv("DOCQA_TELEMETRY_QUEUE_SIZE", "10000"))
+TELEMETRY_FLUSH_ROWS = int(_getenv("DOCQA_TELEMETRY_FLUSH_ROWS", "200"))
+TELEMETRY_FLUSH_INTERVAL_MS = int(_getenv("DOCQA_TELEMETRY_FLUSH_INTERVAL_MS", "500"))
+PROMETHEUS_DIR = os.path.join(DATA_DIR, "prometheus")
+PROMETHEUS_SYNC_INTERVAL_MS = int(_getenv("DOCQA_PROMETHEUS_SYNC_INTERVAL_MS", "1000"))
+PROFILE_DIR = os.path.join(DATA_DIR, "profiles")
+PROFILE_SAMPLE_RATE = float(_getenv("DOCQA_PROFILE_SAMPLE_RATE", "0"))
+PROFILE_TOP_N = int(_getenv("DOCQA_PROFILE_TOP_N", "40"))
 
 # CORS
 _allowed_origins = _getenv("DOCQA_ALLOWED_ORIGINS", "http://localhost:3000")
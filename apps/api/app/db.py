@@ -1,14 +1,41 @@
 from __future__ import annotations
 
 import contextlib
+import itertools
+import threading
 from datetime import datetime, timedelta, timezone
-from typing import Generator, Iterable
-
-from sqlalchemy import Boolean, Float, Integer, String, Text, create_engine, select
-from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column, sessionmaker
+from typing import Generator, Iterable, Iterator
+
+from psycopg import sql as psycopg_sql
+from sqlalchemy import (
+    Boolean,
+    Float,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+    Text,
+    and_,
+    create_engine,
+    delete,
+    insert,
+    or_,
+    select,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import DeclarativeBase, Mapped, Session, defer, mapped_column, sessionmaker
 from sqlalchemy.pool import NullPool
 
-from .config import DATABASE_URL
+from .config import (
+    DATABASE_URL,
+    DB_MAX_OVERFLOW,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE_S,
+    DB_POOL_SIZE,
+)
 
 
 class Base(DeclarativeBase):
@@ -17,6 +44,12 @@ class Base(DeclarativeBase):
 
 class Document(Base):
     __tablename__ = "documents"
+    __table_args__ = (
+        Index("ix_documents_doc_sha256_ingested_at_utc", "doc_sha256", "ingested_at_utc"),
+        # Covers get_latest_docs_snapshot_id without touching the table.
+        Index("ix_documents_ingested_at_utc_snapshot", "ingested_at_utc", "docs_snapshot_id"),
+        Index("ix_documents_docs_snapshot_id", "docs_snapshot_id"),
+    )
 
     doc_id: Mapped[str] = mapped_column(String, primary_key=True)
     doc_sha256: Mapped[str] = mapped_column(String, nullable=False)
@@ -24,10 +57,18 @@ class Document(Base):
     storage_path: Mapped[str] = mapped_column(String, nullable=False)
     ingested_at_utc: Mapped[str] = mapped_column(String, nullable=False)
     docs_snapshot_id: Mapped[str] = mapped_column(String, nullable=False)
+    parser_mode: Mapped[str | None] = mapped_column(String, nullable=True)
+    chunk_size: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    chunk_overlap: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    index_version: Mapped[str | None] = mapped_column(String, nullable=True)
 
 
 class Chunk(Base):
     __tablename__ = "chunks"
+    __table_args__ = (
+        Index("ix_chunks_docs_snapshot_id", "docs_snapshot_id"),
+        Index("ix_chunks_doc_id_page_num_chunk_index", "doc_id", "page_num", "chunk_index"),
+    )
 
     chunk_id: Mapped[str] = mapped_column(String, primary_key=True)
     docs_snapshot_id: Mapped[str] = mapped_column(String, nullable=False)
@@ -43,6 +84,10 @@ class Chunk(Base):
 
 class IndexRecord(Base):
     __tablename__ = "index_records"
+    __table_args__ = (
+        Index("ix_index_records_docs_snapshot_id", "docs_snapshot_id"),
+        Index("ix_index_records_doc_id", "doc_id"),
+    )
 
     chunk_id: Mapped[str] = mapped_column(String, primary_key=True)
     docs_snapshot_id: Mapped[str] = mapped_column(String, nullable=False)
@@ -51,7 +96,8 @@ class IndexRecord(Base):
     page_num: Mapped[int] = mapped_column(Integer, nullable=False)
     chunk_index: Mapped[int] = mapped_column(Integer, nullable=False)
     chunk_text: Mapped[str] = mapped_column(Text, nullable=False)
-    embedding_json: Mapped[str] = mapped_column(Text, nullable=False)
+    embedding_json: Mapped[str | None] = mapped_column(Text, nullable=True)
+    embedding_blob: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
     indexed_at_utc: Mapped[str] = mapped_column(String, nullable=False)
     index_version: Mapped[str] = mapped_column(String, nullable=False)
     retrieval_version: Mapped[str] = mapped_column(String, nullable=False)
@@ -59,6 +105,7 @@ class IndexRecord(Base):
 
 class Telemetry(Base):
     __tablename__ = "telemetry"
+    __table_args__ = (Index("ix_telemetry_timestamp_utc", "timestamp_utc"),)
 
     request_id: Mapped[str] = mapped_column(String, primary_key=True)
     docs_snapshot_id: Mapped[str] = mapped_column(String, nullable=False)
@@ -74,20 +121,84 @@ class Telemetry(Base):
     cache_hit: Mapped[bool] = mapped_column(Boolean, nullable=False)
     refusal_code: Mapped[str | None] = mapped_column(String, nullable=True)
     failure_label: Mapped[str | None] = mapped_column(String, nullable=True)
+    stage_latency_json: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+
+class TelemetryMinute(Base):
+    __tablename__ = "telemetry_minutes"
+
+    minute_utc: Mapped[str] = mapped_column(String, primary_key=True)
+    worker_id: Mapped[str] = mapped_column(String, primary_key=True)
+    request_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    cost_sum: Mapped[float] = mapped_column(Float, nullable=False)
+    cache_hits: Mapped[int] = mapped_column(Integer, nullable=False)
+    refusals_json: Mapped[str] = mapped_column(Text, nullable=False)
+    latency_sketch: Mapped[str] = mapped_column(Text, nullable=False)
+    stage_sketches_json: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # Null for minutes that only recorded upload/ingest stage timings.
+    first_timestamp_utc: Mapped[str | None] = mapped_column(String, nullable=True)
+    last_timestamp_utc: Mapped[str | None] = mapped_column(String, nullable=True)
+
+
+class IngestionJob(Base):
+    __tablename__ = "ingestion_jobs"
+    __table_args__ = (
+        Index("ix_ingestion_jobs_status_created_at_utc", "status", "created_at_utc"),
+        Index("ix_ingestion_jobs_doc_sha256_status", "doc_sha256", "status"),
+    )
+
+    job_id: Mapped[str] = mapped_column(String, primary_key=True)
+    status: Mapped[str] = mapped_column(String, nullable=False)
+    doc_id: Mapped[str] = mapped_column(String, nullable=False)
+    doc_name: Mapped[str] = mapped_column(String, nullable=False)
+    doc_sha256: Mapped[str] = mapped_column(String, nullable=False)
+    docs_snapshot_id: Mapped[str] = mapped_column(String, nullable=False)
+    storage_path: Mapped[str] = mapped_column(String, nullable=False)
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at_utc: Mapped[str] = mapped_column(String, nullable=False)
+    updated_at_utc: Mapped[str] = mapped_column(String, nullable=False)
+    stage_latency_json: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+
+class QueryCacheEntry(Base):
+    __tablename__ = "query_cache"
+    __table_args__ = (Index("ix_query_cache_expires_at", "expires_at"),)
+
+    cache_key: Mapped[str] = mapped_column(String, primary_key=True)
+    payload_json: Mapped[str] = mapped_column(Text, nullable=False)
+    expires_at: Mapped[float] = mapped_column(Float, nullable=False)
+
+
+class EmbeddingCacheEntry(Base):
+    __tablename__ = "embedding_cache"
+
+    cache_key: Mapped[str] = mapped_column(String, primary_key=True)
+    embedding_blob: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    created_at_utc: Mapped[str] = mapped_column(String, nullable=False)
 
 
 def _engine():
     if not DATABASE_URL:
         raise RuntimeError("DB_DATABASE_URL is required.")
-    return create_engine(DATABASE_URL, poolclass=NullPool)
+    if DB_POOL_SIZE <= 0:
+        return create_engine(DATABASE_URL, poolclass=NullPool)
+    return create_engine(
+        DATABASE_URL,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        pool_recycle=DB_POOL_RECYCLE_S,
+    )
+
+
+engine = _engine()
 
 
 def init_db():
-    engine = _engine()
     Base.metadata.create_all(bind=engine)
 
 
-SessionLocal = sessionmaker(bind=_engine(), class_=Session, expire_on_commit=False)
+SessionLocal = sessionmaker(bind=engine, class_=Session, expire_on_commit=False)
 
 
 @contextlib.contextmanager
@@ -103,24 +214,72 @@ def session_scope() -> Generator[Session, None, None]:
         session.close()
 
 
-def insert_document(document: Document) -> None:
+def publish_document(document: Document) -> list[str]:
+    """Insert a completed document, replacing every other document in its snapshot.
+
+    A snapshot holds one content hash, so a new ingest of it supersedes the
+    documents already there; their chunks and index records are deleted in the
+    same transaction. Returns the superseded chunk ids.
+    """
     with session_scope() as session:
+        superseded = select(Document.doc_id).where(
+            Document.docs_snapshot_id == document.docs_snapshot_id,
+            Document.doc_id != document.doc_id,
+        )
+        chunk_ids = list(
+            session.scalars(select(Chunk.chunk_id).where(Chunk.doc_id.in_(superseded))).all()
+        )
+        doc_ids = list(session.scalars(superseded).all())
+        if doc_ids:
+            session.execute(delete(Chunk).where(Chunk.doc_id.in_(doc_ids)))
+            session.execute(delete(IndexRecord).where(IndexRecord.doc_id.in_(doc_ids)))
+            session.execute(delete(Document).where(Document.doc_id.in_(doc_ids)))
         session.add(document)
+        return chunk_ids
 
 
-def insert_chunks(chunks: Iterable[Chunk]) -> None:
+def insert_chunks(rows: Iterable[dict]) -> None:
+    """Bulk insert `chunks` rows given as column dicts."""
     with session_scope() as session:
-        session.add_all(list(chunks))
+        _bulk_insert(session, Chunk, rows)
 
 
-def insert_index_records(records: Iterable[IndexRecord]) -> None:
+def insert_index_records(rows: Iterable[dict]) -> None:
+    """Bulk insert `index_records` rows given as column dicts."""
     with session_scope() as session:
-        session.add_all(list(records))
+        _bulk_insert(session, IndexRecord, rows)
+
+
+_BULK_INSERT_BATCH = 1000
+
+
+def _bulk_insert(session: Session, model: type[Base], rows: Iterable[dict]) -> None:
+    """Insert rows without ORM objects, in one transaction.
+
+    Postgres via psycopg streams every row through a single COPY; other
+    backends get Core executemany in batches of `_BULK_INSERT_BATCH` rows.
+    """
+    bind = session.get_bind()
+    if bind.dialect.name == "postgresql" and bind.dialect.driver == "psycopg":
+        columns = [column.name for column in model.__table__.columns]
+        copy_sql = psycopg_sql.SQL("COPY {} ({}) FROM STDIN").format(
+            psycopg_sql.Identifier(model.__tablename__),
+            psycopg_sql.SQL(", ").join(map(psycopg_sql.Identifier, columns)),
+        )
+        dbapi_connection = session.connection().connection.driver_connection
+        with dbapi_connection.cursor() as cursor, cursor.copy(copy_sql) as copy:
+            for row in rows:
+                copy.write_row([row.get(column) for column in columns])
+        return
+
+    stmt = insert(model)
+    for batch in itertools.batched(rows, _BULK_INSERT_BATCH):
+        session.execute(stmt, list(batch))
 
 
-def insert_telemetry(record: Telemetry) -> None:
+def insert_telemetry_rows(rows: Iterable[dict]) -> None:
     with session_scope() as session:
-        session.add(record)
+        _bulk_insert(session, Telemetry, rows)
 
 
 def get_latest_docs_snapshot_id() -> str | None:
@@ -130,29 +289,326 @@ def get_latest_docs_snapshot_id() -> str | None:
         return row[0] if row else None
 
 
-def get_doc_name(doc_id: str) -> str | None:
+def get_document(doc_id: str) -> Document | None:
     with session_scope() as session:
-        stmt = select(Document.doc_name).where(Document.doc_id == doc_id)
-        row = session.execute(stmt).first()
-        return row[0] if row else None
+        return session.get(Document, doc_id)
+
+
+def load_snapshot_documents(docs_snapshot_id: str | None) -> list[Document]:
+    with session_scope() as session:
+        stmt = select(Document)
+        if docs_snapshot_id:
+            stmt = stmt.where(Document.docs_snapshot_id == docs_snapshot_id)
+        return list(session.scalars(stmt).all())
+
+
+def load_snapshot_doc_ids(docs_snapshot_id: str) -> list[str]:
+    with session_scope() as session:
+        stmt = select(Document.doc_id).where(Document.docs_snapshot_id == docs_snapshot_id)
+        return list(session.scalars(stmt).all())
+
+
+def find_documents_by_sha256(doc_sha256: str) -> list[Document]:
+    with session_scope() as session:
+        stmt = (
+            select(Document)
+            .where(Document.doc_sha256 == doc_sha256)
+            .order_by(Document.ingested_at_utc.desc())
+        )
+        return list(session.scalars(stmt).all())
+
+
+def iter_doc_chunks(doc_id: str, batch_size: int) -> Iterator[list[Chunk]]:
+    """A document's chunks in (page_num, chunk_index) order, batch_size rows per page.
+
+    Pages are keyset-paginated, each in its own session, so no connection is
+    held while the caller processes a page.
+    """
+    after = None
+    while True:
+        with session_scope() as session:
+            stmt = select(Chunk).where(Chunk.doc_id == doc_id)
+            if after is not None:
+                stmt = stmt.where(tuple_(Chunk.page_num, Chunk.chunk_index) > tuple_(*after))
+            stmt = stmt.order_by(Chunk.page_num, Chunk.chunk_index).limit(batch_size)
+            chunks = list(session.scalars(stmt).all())
+        if not chunks:
+            return
+        yield chunks
+        if len(chunks) < batch_size:
+            return
+        after = (chunks[-1].page_num, chunks[-1].chunk_index)
 
 
 def load_chunks(docs_snapshot_id: str | None) -> list[Chunk]:
     with session_scope() as session:
-        stmt = select(Chunk)
+        stmt = select(Chunk).where(Chunk.doc_id.in_(_published_doc_ids(docs_snapshot_id)))
         if docs_snapshot_id:
             stmt = stmt.where(Chunk.docs_snapshot_id == docs_snapshot_id)
         return list(session.scalars(stmt).all())
 
 
-def load_index_records(docs_snapshot_id: str | None) -> list[IndexRecord]:
+def load_index_records(
+    docs_snapshot_id: str | None, with_embeddings: bool = True
+) -> list[IndexRecord]:
     with session_scope() as session:
-        stmt = select(IndexRecord)
+        stmt = select(IndexRecord).where(
+            IndexRecord.doc_id.in_(_published_doc_ids(docs_snapshot_id))
+        )
+        if not with_embeddings:
+            stmt = stmt.options(
+                defer(IndexRecord.embedding_json), defer(IndexRecord.embedding_blob)
+            )
         if docs_snapshot_id:
             stmt = stmt.where(IndexRecord.docs_snapshot_id == docs_snapshot_id)
         return list(session.scalars(stmt).all())
 
 
+def _published_doc_ids(docs_snapshot_id: str | None):
+    # Chunks and index records are written batch by batch while a job runs;
+    # they are only read once the job has written their document row.
+    stmt = select(Document.doc_id)
+    if docs_snapshot_id:
+        stmt = stmt.where(Document.docs_snapshot_id == docs_snapshot_id)
+    return stmt
+
+
+def delete_document_rows(doc_id: str) -> list[str]:
+    """Delete a document with its chunks and index records; returns the chunk ids."""
+    with session_scope() as session:
+        chunk_ids = list(
+            session.scalars(select(Chunk.chunk_id).where(Chunk.doc_id == doc_id)).all()
+        )
+        session.execute(delete(Chunk).where(Chunk.doc_id == doc_id))
+        session.execute(delete(IndexRecord).where(IndexRecord.doc_id == doc_id))
+        session.execute(delete(Document).where(Document.doc_id == doc_id))
+        return chunk_ids
+
+
+def load_unconverted_index_records(limit: int) -> list[IndexRecord]:
+    with session_scope() as session:
+        stmt = (
+            select(IndexRecord)
+            .where(IndexRecord.embedding_blob.is_(None))
+            .where(IndexRecord.embedding_json.is_not(None))
+            .limit(limit)
+        )
+        return list(session.scalars(stmt).all())
+
+
+def set_embedding_blobs(blobs: dict[str, bytes]) -> None:
+    with session_scope() as session:
+        for chunk_id, blob in blobs.items():
+            session.execute(
+                update(IndexRecord)
+                .where(IndexRecord.chunk_id == chunk_id)
+                .values(embedding_blob=blob, embedding_json=None)
+            )
+
+
+def insert_ingestion_job(job: IngestionJob) -> None:
+    with session_scope() as session:
+        session.add(job)
+
+
+def get_ingestion_job(job_id: str) -> IngestionJob | None:
+    with session_scope() as session:
+        return session.get(IngestionJob, job_id)
+
+
+def find_active_ingestion_job(doc_sha256: str, stale_before: str) -> IngestionJob | None:
+    """Newest queued job, or running job updated at or after `stale_before`."""
+    with session_scope() as session:
+        stmt = (
+            select(IngestionJob)
+            .where(
+                IngestionJob.doc_sha256 == doc_sha256,
+                or_(
+                    IngestionJob.status == "queued",
+                    and_(
+                        IngestionJob.status == "running",
+                        IngestionJob.updated_at_utc >= stale_before,
+                    ),
+                ),
+            )
+            .order_by(IngestionJob.created_at_utc.desc())
+        )
+        return session.scalars(stmt).first()
+
+
+def load_queued_ingestion_job_ids() -> list[str]:
+    with session_scope() as session:
+        stmt = (
+            select(IngestionJob.job_id)
+            .where(IngestionJob.status == "queued")
+            .order_by(IngestionJob.created_at_utc)
+        )
+        return list(session.scalars(stmt).all())
+
+
+def claim_ingestion_job(job_id: str, now: str) -> bool:
+    """Move a queued job to running; False if another worker already claimed it."""
+    with session_scope() as session:
+        result = session.execute(
+            update(IngestionJob)
+            .where(IngestionJob.job_id == job_id, IngestionJob.status == "queued")
+            .values(status="running", updated_at_utc=now)
+        )
+        return result.rowcount == 1
+
+
+def touch_ingestion_job(job_id: str, now: str) -> None:
+    """Renew a running job's lease."""
+    with session_scope() as session:
+        session.execute(
+            update(IngestionJob)
+            .where(IngestionJob.job_id == job_id, IngestionJob.status == "running")
+            .values(updated_at_utc=now)
+        )
+
+
+def requeue_stale_ingestion_jobs(stale_before: str, now: str) -> list[str]:
+    """Move running jobs not updated since `stale_before` back to queued; returns their ids."""
+    with session_scope() as session:
+        stale = (IngestionJob.status == "running", IngestionJob.updated_at_utc < stale_before)
+        job_ids = list(session.scalars(select(IngestionJob.job_id).where(*stale)).all())
+        requeued = []
+        for job_id in job_ids:
+            result = session.execute(
+                update(IngestionJob)
+                .where(IngestionJob.job_id == job_id, *stale)
+                .values(status="queued", updated_at_utc=now)
+            )
+            if result.rowcount == 1:
+                requeued.append(job_id)
+        return requeued
+
+
+def finish_ingestion_job(
+    job_id: str,
+    status: str,
+    error: str | None,
+    now: str,
+    stage_latency_json: str | None = None,
+) -> None:
+    with session_scope() as session:
+        session.execute(
+            update(IngestionJob)
+            .where(IngestionJob.job_id == job_id)
+            .values(
+                status=status,
+                error=error,
+                updated_at_utc=now,
+                stage_latency_json=stage_latency_json,
+            )
+        )
+
+
+def get_query_cache_entry(cache_key: str, now: float) -> tuple[str, float] | None:
+    with session_scope() as session:
+        stmt = select(QueryCacheEntry.payload_json, QueryCacheEntry.expires_at).where(
+            QueryCacheEntry.cache_key == cache_key, QueryCacheEntry.expires_at > now
+        )
+        row = session.execute(stmt).first()
+        return (row[0], row[1]) if row else None
+
+
+def load_embedding_cache(cache_keys: Iterable[str]) -> dict[str, bytes]:
+    keys = list(cache_keys)
+    if not keys:
+        return {}
+    with session_scope() as session:
+        stmt = select(EmbeddingCacheEntry.cache_key, EmbeddingCacheEntry.embedding_blob).where(
+            EmbeddingCacheEntry.cache_key.in_(keys)
+        )
+        return {key: blob for key, blob in session.execute(stmt).all()}
+
+
+def insert_embedding_cache(blobs: dict[str, bytes]) -> None:
+    if not blobs:
+        return
+    created_at = datetime.now(timezone.utc).isoformat()
+    rows = [
+        {"cache_key": key, "embedding_blob": blob, "created_at_utc": created_at}
+        for key, blob in blobs.items()
+    ]
+    with session_scope() as session:
+        dialect = session.get_bind().dialect.name
+        if dialect == "postgresql":
+            stmt = postgresql_insert(EmbeddingCacheEntry).on_conflict_do_nothing()
+        elif dialect == "sqlite":
+            stmt = sqlite_insert(EmbeddingCacheEntry).on_conflict_do_nothing()
+        else:
+            existing = load_embedding_cache(blobs)
+            rows = [row for row in rows if row["cache_key"] not in existing]
+            stmt = insert(EmbeddingCacheEntry)
+        if rows:
+            session.execute(stmt, rows)
+
+
+_QUERY_CACHE_PURGE_EVERY = 100
+_query_cache_puts = 0
+_query_cache_puts_lock = threading.Lock()
+
+
+def put_query_cache_entry(cache_key: str, payload_json: str, expires_at: float) -> None:
+    global _query_cache_puts
+    with _query_cache_puts_lock:
+        _query_cache_puts += 1
+        purge = _query_cache_puts % _QUERY_CACHE_PURGE_EVERY == 0
+    with session_scope() as session:
+        session.merge(
+            QueryCacheEntry(cache_key=cache_key, payload_json=payload_json, expires_at=expires_at)
+        )
+        if purge:
+            now = datetime.now(timezone.utc).timestamp()
+            session.execute(delete(QueryCacheEntry).where(QueryCacheEntry.expires_at <= now))
+
+
+def upsert_telemetry_minutes(rows: list[dict]) -> None:
+    """Replace this worker's cumulative bucket rows."""
+    with session_scope() as session:
+        dialect = session.get_bind().dialect.name
+        if dialect not in ("postgresql", "sqlite"):
+            for row in rows:
+                session.merge(TelemetryMinute(**row))
+            return
+        dialect_insert = postgresql_insert if dialect == "postgresql" else sqlite_insert
+        stmt = dialect_insert(TelemetryMinute)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["minute_utc", "worker_id"],
+            set_={
+                name: stmt.excluded[name]
+                for name in rows[0]
+                if name not in ("minute_utc", "worker_id")
+            },
+        )
+        session.execute(stmt, rows)
+
+
+def load_telemetry_minutes(since_minute_utc: str) -> list[TelemetryMinute]:
+    with session_scope() as session:
+        stmt = select(TelemetryMinute).where(TelemetryMinute.minute_utc >= since_minute_utc)
+        return list(session.scalars(stmt).all())
+
+
+def load_worker_telemetry_minutes(worker_id: str, minutes_utc: list[str]) -> list[TelemetryMinute]:
+    with session_scope() as session:
+        stmt = select(TelemetryMinute).where(
+            TelemetryMinute.worker_id == worker_id,
+            TelemetryMinute.minute_utc.in_(minutes_utc),
+        )
+        return list(session.scalars(stmt).all())
+
+
+def delete_telemetry_minutes_before(minute_utc: str) -> int:
+    with session_scope() as session:
+        result = session.execute(
+            delete(TelemetryMinute).where(TelemetryMinute.minute_utc < minute_utc)
+        )
+        return result.rowcount or 0
+
+
 def load_telemetry(hours: int = 24, limit: int = 500) -> list[Telemetry]:
     with session_scope() as session:
         cutoff = datetime.now(timezone.utc) - timedelta(hours=hours)
@@ -0,0 +1,83 @@
+"""In-process document metadata for citation assembly."""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Set
+
+from .db import Document, get_document, load_snapshot_documents
+
+_MAX_ENTRIES = 65536
+
+
+@dataclass(frozen=True)
+class DocMetadata:
+    doc_id: str
+    doc_name: str
+    doc_sha256: str
+    ingested_at_utc: str
+
+
+_entries: "OrderedDict[str, DocMetadata]" = OrderedDict()
+_loaded_snapshots: Set[str] = set()
+_lock = threading.Lock()
+
+
+def get(doc_id: str) -> Optional[DocMetadata]:
+    with _lock:
+        meta = _entries.get(doc_id)
+        if meta is not None:
+            _entries.move_to_end(doc_id)
+            return meta
+    # Ingested by another worker after this one loaded the snapshot.
+    document = get_document(doc_id)
+    if document is None:
+        return None
+    return remember(document)
+
+
+def doc_name(doc_id: str) -> Optional[str]:
+    meta = get(doc_id)
+    return meta.doc_name if meta is not None else None
+
+
+def load_snapshot(docs_snapshot_id: Optional[str]) -> None:
+    """Cache every document in a snapshot with one query, once per process."""
+    key = docs_snapshot_id or ""
+    with _lock:
+        if key in _loaded_snapshots:
+            return
+    _remember_all(load_snapshot_documents(docs_snapshot_id))
+    with _lock:
+        _loaded_snapshots.add(key)
+
+
+def remember(document: Document) -> DocMetadata:
+    return _remember_all([document])[0]
+
+
+def clear() -> None:
+    with _lock:
+        _entries.clear()
+        _loaded_snapshots.clear()
+
+
+def _remember_all(documents: Iterable[Document]) -> List[DocMetadata]:
+    metas = [
+        DocMetadata(
+            doc_id=document.doc_id,
+            doc_name=document.doc_name,
+            doc_sha256=document.doc_sha256,
+            ingested_at_utc=document.ingested_at_utc,
+        )
+        for document in documents
+    ]
+    with _lock:
+        for meta in metas:
+            _entries[meta.doc_id] = meta
+            _entries.move_to_end(meta.doc_id)
+        while len(_entries) > _MAX_ENTRIES:
+            _entries.popitem(last=False)
+            # An evicted entry may belong to a loaded snapshot; reload on demand.
+            _loaded_snapshots.clear()
+    return metas
@@ -1,22 +1,112 @@
 import hashlib
 import json
+import random
+import threading
+import time
+import urllib.error
 import urllib.request
-from typing import List
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Sequence
+
+import numpy as np
 
 from .config import (
     AZURE_OPENAI_API_KEY,
     AZURE_OPENAI_API_VERSION,
     AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT,
     AZURE_OPENAI_ENDPOINT,
+    EMBEDDING_CACHE_PERSIST,
+    EMBEDDING_CACHE_SIZE,
+    EMBEDDINGS_BACKOFF_S,
+    EMBEDDINGS_BATCH_MAX_INPUTS,
+    EMBEDDINGS_BATCH_MAX_TOKENS,
+    EMBEDDINGS_CONCURRENCY,
     EMBEDDINGS_DIM,
+    EMBEDDINGS_MAX_RETRIES,
     EMBEDDINGS_MODE,
+    EMBEDDINGS_TIMEOUT_S,
 )
+from .db import insert_embedding_cache, load_embedding_cache
+from .prometheus import EMBEDDING_DURATION
+
+_RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+# Longer Retry-After values are clamped so one reply cannot stall an ingest job.
+_MAX_RETRY_AFTER_S = 60.0
+
+_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+_cache_lock = threading.Lock()
 
 
 def embed_texts(texts: List[str]) -> List[List[float]]:
-    if EMBEDDINGS_MODE != "local":
-        return _azure_openai_embeddings(texts)
-    return [_hash_embed(text) for text in texts]
+    started = time.perf_counter()
+    try:
+        if EMBEDDINGS_MODE != "local":
+            return _cached_remote_embeddings(texts)
+        return [_hash_embed(text) for text in texts]
+    finally:
+        EMBEDDING_DURATION.observe(time.perf_counter() - started, mode=EMBEDDINGS_MODE)
+
+
+def embedding_cache_key(text: str) -> str:
+    """Content address for a remote embedding: text, deployment and dimension."""
+    material = f"{AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT}\x1f{EMBEDDINGS_DIM}\x1f{text}"
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def _cached_remote_embeddings(texts: List[str]) -> List[List[float]]:
+    keys = [embedding_cache_key(text) for text in texts]
+    found: Dict[str, np.ndarray] = {}
+    with _cache_lock:
+        for key in keys:
+            vector = _cache.get(key)
+            if vector is not None:
+                _cache.move_to_end(key)
+                found[key] = vector
+
+    missing = [key for key in dict.fromkeys(keys) if key not in found]
+    if missing and EMBEDDING_CACHE_PERSIST:
+        try:
+            stored = load_embedding_cache(missing)
+        except Exception as e:  # noqa: BLE001 - the persistent tier is best effort
+            print(f"Warning: Embedding cache lookup failed: {e}")
+            stored = {}
+        for key, blob in stored.items():
+            found[key] = decode_embedding(blob)
+        missing = [key for key in missing if key not in found]
+
+    if missing:
+        text_for = dict(zip(keys, texts))
+        fresh = _azure_openai_embeddings([text_for[key] for key in missing])
+        new_blobs = {}
+        for key, embedding in zip(missing, fresh, strict=True):
+            blob = encode_embedding(embedding)
+            new_blobs[key] = blob
+            found[key] = decode_embedding(blob)
+        if EMBEDDING_CACHE_PERSIST:
+            try:
+                insert_embedding_cache(new_blobs)
+            except Exception as e:  # noqa: BLE001 - the persistent tier is best effort
+                print(f"Warning: Embedding cache write failed: {e}")
+
+    with _cache_lock:
+        for key in keys:
+            _cache[key] = found[key]
+            _cache.move_to_end(key)
+        while len(_cache) > EMBEDDING_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return [found[key].tolist() for key in keys]
+
+
+def encode_embedding(vector: Sequence[float]) -> bytes:
+    """Serialize an embedding as little-endian float32 bytes."""
+    return np.asarray(vector, dtype="<f4").tobytes()
+
+
+def decode_embedding(blob: bytes) -> np.ndarray:
+    """Read-only float32 view over bytes produced by `encode_embedding`."""
+    return np.frombuffer(blob, dtype="<f4")
 
 
 def _hash_embed(text: str) -> List[float]:
@@ -39,15 +129,78 @@ def _azure_openai_embeddings(texts: List[str]) -> List[List[float]]:
         f"/openai/deployments/{AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT}/embeddings"
         f"?api-version={AZURE_OPENAI_API_VERSION}"
     )
-    payload = {"input": texts}
-    request = urllib.request.Request(
-        url,
-        data=json.dumps(payload).encode("utf-8"),
-        headers={"api-key": AZURE_OPENAI_API_KEY, "Content-Type": "application/json"},
-        method="POST",
-    )
-    with urllib.request.urlopen(request, timeout=30) as response:
-        data = json.load(response)
+    batches = _batch_texts(texts)
+    if len(batches) <= 1:
+        results = [_post_embeddings(url, batch) for batch in batches]
+    else:
+        workers = min(EMBEDDINGS_CONCURRENCY, len(batches))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(lambda batch: _post_embeddings(url, batch), batches))
+    return [embedding for batch in results for embedding in batch]
+
+
+def _batch_texts(texts: List[str]) -> List[List[str]]:
+    """Split texts into order-preserving batches bounded by input count and tokens.
+
+    Tokens are estimated as characters / 4; a single oversized text still gets
+    its own batch and is left for the service to reject.
+    """
+    batches: List[List[str]] = []
+    current: List[str] = []
+    current_tokens = 0
+    for text in texts:
+        tokens = len(text) // 4 + 1
+        if current and (
+            len(current) >= EMBEDDINGS_BATCH_MAX_INPUTS
+            or current_tokens + tokens > EMBEDDINGS_BATCH_MAX_TOKENS
+        ):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(text)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _post_embeddings(url: str, texts: List[str]) -> List[List[float]]:
+    payload = json.dumps({"input": texts}).encode("utf-8")
+    for attempt in range(EMBEDDINGS_MAX_RETRIES + 1):
+        request = urllib.request.Request(
+            url,
+            data=payload,
+            headers={"api-key": AZURE_OPENAI_API_KEY, "Content-Type": "application/json"},
+            method="POST",
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=EMBEDDINGS_TIMEOUT_S) as response:
+                data = json.load(response)
+            break
+        except urllib.error.HTTPError as e:
+            if e.code not in _RETRYABLE_STATUS or attempt == EMBEDDINGS_MAX_RETRIES:
+                raise RuntimeError(f"Azure OpenAI embeddings request failed: {e.code}") from e
+            time.sleep(_retry_delay(e.headers.get("Retry-After"), attempt))
+        except (urllib.error.URLError, TimeoutError, ConnectionError) as e:
+            # Resets, refused connections and read timeouts are as transient as a 503.
+            if attempt == EMBEDDINGS_MAX_RETRIES:
+                raise RuntimeError(f"Azure OpenAI embeddings request failed: {e}") from e
+            time.sleep(_retry_delay(None, attempt))
     if "data" not in data:
         raise RuntimeError("Azure OpenAI embeddings response missing data.")
-    return [item["embedding"] for item in data["data"]]
+    items = sorted(data["data"], key=lambda item: item.get("index", 0))
+    if len(items) != len(texts):
+        raise RuntimeError("Azure OpenAI embeddings response has the wrong number of items.")
+    return [item["embedding"] for item in items]
+
+
+def _retry_delay(retry_after: str | None, attempt: int) -> float:
+    if retry_after:
+        try:
+            return min(max(float(retry_after), 0.0), _MAX_RETRY_AFTER_S)
+        except ValueError:
+            try:
+                when = parsedate_to_datetime(retry_after)
+                return min(max(when.timestamp() - time.time(), 0.0), _MAX_RETRY_AFTER_S)
+            except (TypeError, ValueError):
+                pass
+    return min(EMBEDDINGS_BACKOFF_S * (2**attempt), 30.0) * (0.5 + random.random() / 2)
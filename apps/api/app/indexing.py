@@ -1,7 +1,8 @@
+import itertools
 import json
 import urllib.request
 import urllib.error
-from typing import List, Tuple
+from typing import Callable, Iterable, List, Optional, Tuple
 
 from .config import (
     AZURE_SEARCH_API_KEY,
@@ -14,9 +15,12 @@ from .config import (
     INDEX_VERSION,
     RETRIEVAL_VERSION,
 )
-from .db import IndexRecord, insert_index_records
-from .embeddings import embed_texts
+from .db import insert_index_records
+from .embeddings import embed_texts, encode_embedding
 from .ingestion import utc_now
+from .local_index import invalidate as invalidate_local_index
+from .segments import SegmentWriter
+from .timings import stage
 
 
 def index_chunk_rows(
@@ -25,11 +29,76 @@ def index_chunk_rows(
     docs_snapshot_id: str,
     chunk_rows: List[Tuple],
 ) -> None:
+    index_chunk_batches(doc_id, doc_name, docs_snapshot_id, [chunk_rows])
+
+
+def index_chunk_batches(
+    doc_id: str,
+    doc_name: str,
+    docs_snapshot_id: str,
+    batches: Iterable[List[Tuple]],
+    publish: Optional[Callable[[], List[str]]] = None,
+) -> None:
+    """Embed and index chunk rows one batch at a time.
+
+    Only the current batch's embeddings are held in memory. A snapshot holds
+    one document's content, so the segment is rebuilt from these rows alone.
+    `publish` runs after the last batch, under the snapshot's segment lock and
+    before the segment is committed; it returns chunk ids it superseded, which
+    are removed from the remote index.
+    """
     if not ENABLE_INDEXING:
+        for _ in batches:
+            pass
+        if publish is not None:
+            publish()
         return
 
+    if _azure_enabled():
+        ensure_index()
+        for chunk_rows in batches:
+            records = _index_records(doc_name, chunk_rows)
+            with stage("index"):
+                _azure_upload(records)
+        superseded = publish() if publish is not None else []
+        with stage("index"):
+            remove_chunks(superseded)
+        return
+
+    with stage("index"), SegmentWriter(docs_snapshot_id) as segment:
+        for chunk_rows in batches:
+            records = _index_records(doc_name, chunk_rows)
+            with stage("db_insert"):
+                insert_index_records(
+                    {
+                        "chunk_id": rec["chunk_id"],
+                        "docs_snapshot_id": rec["docs_snapshot_id"],
+                        "doc_id": rec["doc_id"],
+                        "doc_name": rec["doc_name"],
+                        "page_num": rec["page_num"],
+                        "chunk_index": rec["chunk_index"],
+                        "chunk_text": rec["chunk_text"],
+                        "embedding_blob": encode_embedding(rec["embedding_vector"]),
+                        "indexed_at_utc": rec["indexed_at_utc"],
+                        "index_version": rec["index_version"],
+                        "retrieval_version": rec["retrieval_version"],
+                    }
+                    for rec in records
+                )
+            segment.add(
+                [rec["chunk_id"] for rec in records],
+                [rec["embedding_vector"] for rec in records],
+                [rec["chunk_text"] for rec in records],
+            )
+        if publish is not None:
+            publish()
+    invalidate_local_index(docs_snapshot_id)
+
+
+def _index_records(doc_name: str, chunk_rows: List[Tuple]) -> List[dict]:
     texts = [row[8] for row in chunk_rows]
-    embeddings = embed_texts(texts)
+    with stage("embed"):
+        embeddings = embed_texts(texts)
     indexed_at = utc_now()
 
     records = []
@@ -61,27 +130,7 @@ def index_chunk_rows(
                 "retrieval_version": RETRIEVAL_VERSION,
             }
         )
-
-    if _azure_enabled():
-        ensure_index()
-        _azure_upload(records)
-    else:
-        insert_index_records(
-            IndexRecord(
-                chunk_id=rec["chunk_id"],
-                docs_snapshot_id=rec["docs_snapshot_id"],
-                doc_id=rec["doc_id"],
-                doc_name=rec["doc_name"],
-                page_num=rec["page_num"],
-                chunk_index=rec["chunk_index"],
-                chunk_text=rec["chunk_text"],
-                embedding_json=json.dumps(rec["embedding_vector"]),
-                indexed_at_utc=rec["indexed_at_utc"],
-                index_version=rec["index_version"],
-                retrieval_version=rec["retrieval_version"],
-            )
-            for rec in records
-        )
+    return records
 
 
 def _azure_enabled() -> bool:
@@ -147,6 +196,20 @@ def _azure_upload(records: List[dict]) -> None:
     _azure_request("POST", url, payload)
 
 
+def remove_chunks(chunk_ids: List[str]) -> None:
+    """Delete chunks from the remote index; local segments are rewritten per ingest."""
+    if not chunk_ids or not ENABLE_INDEXING or not _azure_enabled():
+        return
+    url = _azure_url(f"/indexes/{AZURE_SEARCH_INDEX}/docs/index?api-version={AZURE_SEARCH_API_VERSION}")
+    # Azure Search accepts at most 1000 actions per indexing request.
+    for batch in itertools.batched(chunk_ids, 1000):
+        payload = {"value": [{"@search.action": "delete", "chunk_id": chunk_id} for chunk_id in batch]}
+        try:
+            _azure_request("POST", url, payload)
+        except Exception as e:  # noqa: BLE001 - the DB rows are already gone; stale hits are logged
+            print(f"Warning: Removing {len(batch)} chunks from the search index failed: {e}")
+
+
 def _azure_url(path: str) -> str:
     return f"{AZURE_SEARCH_ENDPOINT.rstrip('/')}{path}"
 
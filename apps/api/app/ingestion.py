@@ -1,7 +1,13 @@
 import hashlib
+import itertools
+import multiprocessing
 import os
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from datetime import datetime, timezone
-from typing import List, Tuple
+from typing import BinaryIO, Deque, Iterable, Iterator, List, Optional, Tuple
 
 from pypdf import PdfReader
 from azure.storage.blob import BlobServiceClient
@@ -11,37 +17,102 @@ from .config import (
     AZURE_STORAGE_CONTAINER,
     CHUNK_OVERLAP,
     CHUNK_SIZE,
+    INDEX_VERSION,
+    PARSE_PARALLEL_MIN_PAGES,
+    PARSE_POOL_IDLE_S,
+    PARSE_WORKERS,
     PARSER_MODE,
     RAW_DIR,
 )
+from .timings import stage
+
+_COPY_BLOCK_BYTES = 4 * 1024 * 1024
+
+# A range is one pool task; each re-opens the PDF, so ranges must not be tiny.
+_MIN_PAGES_PER_RANGE = 16
+
+_parse_pool: Optional[ProcessPoolExecutor] = None
+_parse_pool_lock = threading.Lock()
+_parse_pool_users = 0
+_parse_pool_idle_timer: Optional[threading.Timer] = None
 
 
 def compute_sha256(data: bytes) -> str:
     return hashlib.sha256(data).hexdigest()
 
 
+def stage_upload(source: BinaryIO) -> Tuple[str, str, int]:
+    """Copy an upload stream into RAW_DIR block by block, hashing as it goes.
+
+    Returns (staged_path, doc_sha256, size). The staged file is renamed into
+    place by `save_raw_pdf`; callers remove it if the upload is not kept.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    fd, staged_path = tempfile.mkstemp(dir=RAW_DIR, prefix=".upload-", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while True:
+                with stage("read"):
+                    block = source.read(_COPY_BLOCK_BYTES)
+                if not block:
+                    break
+                with stage("hash"):
+                    digest.update(block)
+                with stage("store"):
+                    f.write(block)
+                size += len(block)
+    except BaseException:
+        discard_staged_upload(staged_path)
+        raise
+    return staged_path, digest.hexdigest(), size
+
+
+def discard_staged_upload(staged_path: str) -> None:
+    try:
+        os.remove(staged_path)
+    except FileNotFoundError:
+        pass
+
+
 def docs_snapshot_id_for(doc_sha256: str) -> str:
     return f"snap_{doc_sha256[:12]}"
 
 
-def save_raw_pdf(doc_id: str, filename: str, data: bytes) -> str:
+def save_raw_pdf(doc_id: str, filename: str, staged_path: str) -> str:
+    """Move a staged upload to its permanent name in RAW_DIR."""
     safe_name = filename.replace(" ", "_")
     path = os.path.join(RAW_DIR, f"{doc_id}_{safe_name}")
-    
-    # Save locally
-    with open(path, "wb") as f:
-        f.write(data)
-    
-    # Save to Azure if configured
-    if AZURE_STORAGE_CONNECTION_STRING:
-        _upload_to_azure(f"{doc_id}_{safe_name}", data)
-        
+    os.replace(staged_path, path)
     return path
 
 
-def _upload_to_azure(blob_name: str, data: bytes) -> None:
+def archive_raw_pdf(path: str) -> None:
+    """Copy a saved raw PDF to Azure Blob Storage if configured."""
+    if not AZURE_STORAGE_CONNECTION_STRING:
+        return
+    with open(path, "rb") as f:
+        _upload_to_azure(os.path.basename(path), f, os.path.getsize(path))
+
+
+def same_ingest_config(document, *, chunking_only: bool) -> bool:
+    """Whether `document` was ingested with the current parsing/chunking (and index) settings."""
+    same_chunking = (
+        document.parser_mode == PARSER_MODE
+        and document.chunk_size == CHUNK_SIZE
+        and document.chunk_overlap == CHUNK_OVERLAP
+    )
+    return same_chunking and (chunking_only or document.index_version == INDEX_VERSION)
+
+
+def _upload_to_azure(blob_name: str, stream: BinaryIO, length: int) -> None:
     try:
-        service_client = BlobServiceClient.from_connection_string(AZURE_STORAGE_CONNECTION_STRING)
+        # Streams larger than one block go up as staged blocks read from disk.
+        service_client = BlobServiceClient.from_connection_string(
+            AZURE_STORAGE_CONNECTION_STRING,
+            max_block_size=_COPY_BLOCK_BYTES,
+            max_single_put_size=_COPY_BLOCK_BYTES,
+        )
         container_client = service_client.get_container_client(AZURE_STORAGE_CONTAINER)
         
         # Try to create container if it doesn't exist
@@ -51,18 +122,109 @@ def _upload_to_azure(blob_name: str, data: bytes) -> None:
             pass
             
         blob_client = container_client.get_blob_client(blob_name)
-        blob_client.upload_blob(data, overwrite=True)
+        blob_client.upload_blob(stream, length=length, overwrite=True)
     except Exception as e:
         print(f"Warning: Failed to upload to Azure Blob Storage: {e}")
 
 
 def parse_pdf_pages(path: str) -> List[str]:
+    return list(iter_pdf_pages(path))
+
+
+def iter_pdf_pages(path: str) -> Iterator[str]:
+    """Yield normalized page texts in order without holding the whole document.
+
+    Large PDFs are parsed in page ranges on the process pool with at most
+    two ranges per worker in flight, so a slow consumer holds back parsing.
+    The pool is stopped after `PARSE_POOL_IDLE_S` without a parse.
+    """
     reader = PdfReader(path)
-    pages = []
-    for page in reader.pages:
-        text = page.extract_text() or ""
-        pages.append(_normalize_whitespace(text))
-    return pages
+    page_count = len(reader.pages)
+    if PARSE_WORKERS <= 1 or page_count < PARSE_PARALLEL_MIN_PAGES:
+        for index in range(page_count):
+            yield _extract_page(reader, index)
+        return
+
+    # Several ranges per worker so one slow range does not leave cores idle.
+    step = max(_MIN_PAGES_PER_RANGE, -(-page_count // (PARSE_WORKERS * 4)))
+    ranges = iter([(start, min(start + step, page_count)) for start in range(0, page_count, step)])
+    pool = _acquire_parse_pool()
+    in_flight: Deque[Future] = deque()
+    try:
+        for start, end in itertools.islice(ranges, PARSE_WORKERS * 2):
+            in_flight.append(pool.submit(_extract_page_range, path, start, end))
+        while in_flight:
+            pages = in_flight.popleft().result()
+            next_range = next(ranges, None)
+            if next_range is not None:
+                in_flight.append(pool.submit(_extract_page_range, path, *next_range))
+            yield from pages
+    finally:
+        for future in in_flight:
+            future.cancel()
+        _release_parse_pool()
+
+
+def _extract_page_range(path: str, start: int, end: int) -> List[str]:
+    # Runs in a pool process: each worker opens its own reader.
+    return _extract_pages(PdfReader(path), start, end)
+
+
+def _extract_pages(reader: PdfReader, start: int, end: int) -> List[str]:
+    return [_extract_page(reader, index) for index in range(start, end)]
+
+
+def _extract_page(reader: PdfReader, index: int) -> str:
+    return _normalize_whitespace(reader.pages[index].extract_text() or "")
+
+
+def _acquire_parse_pool() -> ProcessPoolExecutor:
+    global _parse_pool, _parse_pool_users, _parse_pool_idle_timer
+    with _parse_pool_lock:
+        if _parse_pool_idle_timer is not None:
+            _parse_pool_idle_timer.cancel()
+            _parse_pool_idle_timer = None
+        if _parse_pool is None:
+            # spawn: forking a process that already runs threads can deadlock.
+            _parse_pool = ProcessPoolExecutor(
+                max_workers=PARSE_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        _parse_pool_users += 1
+        return _parse_pool
+
+
+def _release_parse_pool() -> None:
+    global _parse_pool_users, _parse_pool_idle_timer
+    with _parse_pool_lock:
+        _parse_pool_users -= 1
+        if _parse_pool_users or _parse_pool is None:
+            return
+        timer = threading.Timer(max(PARSE_POOL_IDLE_S, 0), _stop_idle_parse_pool)
+        timer.daemon = True
+        _parse_pool_idle_timer = timer
+        timer.start()
+
+
+def _stop_idle_parse_pool() -> None:
+    global _parse_pool, _parse_pool_idle_timer
+    with _parse_pool_lock:
+        # A parse that started after the timer fired keeps the pool.
+        if _parse_pool_users or _parse_pool_idle_timer is not threading.current_thread():
+            return
+        pool, _parse_pool, _parse_pool_idle_timer = _parse_pool, None, None
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+
+def shutdown_parse_pool() -> None:
+    global _parse_pool, _parse_pool_idle_timer
+    with _parse_pool_lock:
+        if _parse_pool_idle_timer is not None:
+            _parse_pool_idle_timer.cancel()
+            _parse_pool_idle_timer = None
+        if _parse_pool is not None:
+            _parse_pool.shutdown(wait=True, cancel_futures=True)
+            _parse_pool = None
 
 
 def _normalize_whitespace(text: str) -> str:
@@ -92,27 +254,50 @@ def build_chunk_rows(
     docs_snapshot_id: str,
     pages: List[str],
 ) -> List[tuple]:
-    rows = []
+    return list(iter_chunk_rows(doc_id, doc_sha256, docs_snapshot_id, pages))
+
+
+def iter_chunk_rows(
+    doc_id: str,
+    doc_sha256: str,
+    docs_snapshot_id: str,
+    pages: Iterable[str],
+) -> Iterator[tuple]:
     for page_num, page_text in enumerate(pages, start=1):
         for chunk_index, (char_start, char_end, chunk_text) in enumerate(
             chunk_page_text(page_text)
         ):
-            chunk_id = make_chunk_id(doc_id, page_num, chunk_index)
-            rows.append(
-                (
-                    chunk_id,
-                    docs_snapshot_id,
-                    doc_id,
-                    doc_sha256,
-                    page_num,
-                    chunk_index,
-                    char_start,
-                    char_end,
-                    chunk_text,
-                    PARSER_MODE,
-                )
+            yield (
+                make_chunk_id(doc_id, page_num, chunk_index),
+                docs_snapshot_id,
+                doc_id,
+                doc_sha256,
+                page_num,
+                chunk_index,
+                char_start,
+                char_end,
+                chunk_text,
+                PARSER_MODE,
             )
-    return rows
+
+
+def rebuild_chunk_rows(doc_id: str, docs_snapshot_id: str, chunks: List) -> List[tuple]:
+    """Re-key previously parsed chunks of identical content for a new doc_id."""
+    return [
+        (
+            make_chunk_id(doc_id, chunk.page_num, chunk.chunk_index),
+            docs_snapshot_id,
+            doc_id,
+            chunk.doc_sha256,
+            chunk.page_num,
+            chunk.chunk_index,
+            chunk.char_start,
+            chunk.char_end,
+            chunk.chunk_text,
+            chunk.parse_mode,
+        )
+        for chunk in chunks
+    ]
 
 
 def utc_now() -> str:
@@ -0,0 +1,305 @@
+"""Background ingestion jobs for /v1/docs/upload."""
+
+import itertools
+import json
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+from . import doc_metadata, indexing, ingestion, prometheus, snapshots, timings
+from .config import (
+    CHUNK_OVERLAP,
+    CHUNK_SIZE,
+    INDEX_VERSION,
+    INGEST_BATCH_SIZE,
+    INGEST_JOB_LEASE_S,
+    INGEST_WORKERS,
+    PARSER_MODE,
+)
+from .db import (
+    Document,
+    IngestionJob,
+    claim_ingestion_job,
+    delete_document_rows,
+    find_active_ingestion_job,
+    find_documents_by_sha256,
+    finish_ingestion_job,
+    get_ingestion_job,
+    insert_chunks,
+    publish_document,
+    insert_ingestion_job,
+    iter_doc_chunks,
+    load_queued_ingestion_job_ids,
+    requeue_stale_ingestion_jobs,
+    touch_ingestion_job,
+)
+from .telemetry import record_stages
+
+T = TypeVar("T")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_reaper: Optional[threading.Thread] = None
+_reaper_stop = threading.Event()
+
+
+class ParseFailed(Exception):
+    pass
+
+
+def create_job(
+    doc_name: str, staged_path: str, doc_sha256: str, docs_snapshot_id: str
+) -> IngestionJob:
+    doc_id = uuid.uuid4().hex
+    storage_path = ingestion.save_raw_pdf(doc_id, doc_name, staged_path)
+    now = ingestion.utc_now()
+    job = IngestionJob(
+        job_id=uuid.uuid4().hex,
+        status="queued",
+        doc_id=doc_id,
+        doc_name=doc_name,
+        doc_sha256=doc_sha256,
+        docs_snapshot_id=docs_snapshot_id,
+        storage_path=storage_path,
+        error=None,
+        created_at_utc=now,
+        updated_at_utc=now,
+    )
+    insert_ingestion_job(job)
+    submit(job.job_id)
+    return job
+
+
+def job_payload(job: IngestionJob) -> Dict:
+    return {
+        "job_id": job.job_id,
+        "status": job.status,
+        "doc_id": job.doc_id,
+        "doc_sha256": job.doc_sha256,
+        "docs_snapshot_id": job.docs_snapshot_id,
+        "error": job.error,
+        "created_at_utc": job.created_at_utc,
+        "updated_at_utc": job.updated_at_utc,
+        "stage_latency_ms": json.loads(job.stage_latency_json or "{}"),
+    }
+
+
+def find_active_job(doc_sha256: str) -> Optional[IngestionJob]:
+    """A queued job for these bytes, or a running one still holding its lease."""
+    return find_active_ingestion_job(doc_sha256, _stale_before())
+
+
+def submit(job_id: str) -> None:
+    _get_executor().submit(run_job, job_id)
+
+
+def resume_queued_jobs() -> None:
+    """Submit queued jobs and start requeueing running jobs whose lease expired.
+
+    A job is `running` from its claim until it finishes and renews its lease
+    after every batch; one whose process died stops renewing and is requeued
+    (its partial rows discarded) by whichever process checks next.
+    """
+    global _reaper
+    _requeue_stale_jobs()
+    for job_id in load_queued_ingestion_job_ids():
+        submit(job_id)
+    if _reaper is None:
+        _reaper = threading.Thread(target=_reap_loop, name="ingest-reaper", daemon=True)
+        _reaper.start()
+
+
+def shutdown() -> None:
+    """Stop accepting work; jobs not yet started stay queued in the DB."""
+    global _executor, _reaper
+    reaper, _reaper = _reaper, None
+    if reaper is not None:
+        _reaper_stop.set()
+        reaper.join(5.0)
+        _reaper_stop.clear()
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True, cancel_futures=True)
+            _executor = None
+
+
+def _reap_loop() -> None:
+    while not _reaper_stop.wait(max(INGEST_JOB_LEASE_S / 2, 1)):
+        try:
+            _requeue_stale_jobs()
+        except Exception as e:  # noqa: BLE001 - retried on the next pass
+            print(f"Warning: Requeueing stale ingestion jobs failed: {e}")
+
+
+def _requeue_stale_jobs() -> None:
+    for job_id in requeue_stale_ingestion_jobs(_stale_before(), ingestion.utc_now()):
+        print(f"Warning: Requeueing ingestion job {job_id}; its lease expired.")
+        _discard_partial_ingest(get_ingestion_job(job_id))
+        submit(job_id)
+
+
+def _stale_before() -> str:
+    return (datetime.now(timezone.utc) - timedelta(seconds=INGEST_JOB_LEASE_S)).isoformat()
+
+
+def run_job(job_id: str) -> None:
+    if not claim_ingestion_job(job_id, ingestion.utc_now()):
+        return
+    job = get_ingestion_job(job_id)
+    status, error = "succeeded", None
+    with timings.collect() as timer:
+        try:
+            _ingest(job)
+        except ParseFailed as exc:
+            status, error = "failed", f"PARSE_FAILED: {exc}"
+        except Exception as exc:  # noqa: BLE001 - recorded on the job for the status endpoint
+            print(f"Warning: Ingestion job {job_id} failed: {exc}")
+            status, error = "failed", str(exc)
+        if status == "failed":
+            _discard_partial_ingest(job)
+    stage_latency_ms = timer.rounded()
+    finish_ingestion_job(
+        job_id, status, error, ingestion.utc_now(), json.dumps(stage_latency_ms)
+    )
+    record_stages("ingest", stage_latency_ms)
+    prometheus.INGEST_JOBS.inc(status=status)
+
+
+def _ingest(job: IngestionJob) -> None:
+    with timings.stage("archive"):
+        ingestion.archive_raw_pdf(job.storage_path)
+
+    # Same bytes parsed and chunked the same way: only index metadata changed,
+    # so reuse the chunks instead of re-parsing. Remote embeddings for the
+    # unchanged chunk texts are served by the embedding cache.
+    with timings.stage("db_read"):
+        prior_docs = find_documents_by_sha256(job.doc_sha256)
+        reusable = next(
+            (d for d in prior_docs if ingestion.same_ingest_config(d, chunking_only=True)),
+            None,
+        )
+    tally: Counter = Counter()
+    if reusable is not None:
+        chunk_rows = _reused_chunk_rows(job, reusable.doc_id, tally)
+    else:
+        pages = _counted(
+            timings.timed_iter("parse", _parsed_pages(job.storage_path)), tally, "pages"
+        )
+        chunk_rows = timings.timed_iter(
+            "chunk",
+            ingestion.iter_chunk_rows(job.doc_id, job.doc_sha256, job.docs_snapshot_id, pages),
+        )
+
+    published: List[Document] = []
+
+    def publish() -> List[str]:
+        # Written last so a document row always means a completed ingest, which
+        # is what upload dedup relies on. Replaces the documents this one
+        # supersedes (same content, older settings) in the same transaction.
+        document = Document(
+            doc_id=job.doc_id,
+            doc_sha256=job.doc_sha256,
+            doc_name=job.doc_name,
+            storage_path=job.storage_path,
+            ingested_at_utc=ingestion.utc_now(),
+            docs_snapshot_id=job.docs_snapshot_id,
+            parser_mode=PARSER_MODE,
+            chunk_size=CHUNK_SIZE,
+            chunk_overlap=CHUNK_OVERLAP,
+            index_version=INDEX_VERSION,
+        )
+        with timings.stage("db_insert"):
+            superseded_chunk_ids = publish_document(document)
+        published.append(document)
+        return superseded_chunk_ids
+
+    indexing.index_chunk_batches(
+        doc_id=job.doc_id,
+        doc_name=job.doc_name,
+        docs_snapshot_id=job.docs_snapshot_id,
+        batches=_stored_batches(job.job_id, _counted(chunk_rows, tally, "chunks")),
+        publish=publish,
+    )
+    prometheus.INGEST_PAGES.observe(tally["pages"])
+    prometheus.INGEST_CHUNKS.observe(tally["chunks"])
+    doc_metadata.remember(published[0])
+    snapshots.mark_ingested(job.docs_snapshot_id)
+
+
+def _reused_chunk_rows(job: IngestionJob, prior_doc_id: str, tally: Counter) -> Iterator[Tuple]:
+    """Re-keyed chunk rows of a prior document, read a batch at a time."""
+    last_page = None
+    pages = iter_doc_chunks(prior_doc_id, max(INGEST_BATCH_SIZE, 1))
+    for chunks in timings.timed_iter("db_read", pages):
+        for chunk in chunks:
+            # Rows arrive in page order, so each new page_num is a new page.
+            if chunk.page_num != last_page:
+                tally["pages"] += 1
+                last_page = chunk.page_num
+        yield from ingestion.rebuild_chunk_rows(job.doc_id, job.docs_snapshot_id, chunks)
+
+
+def _discard_partial_ingest(job: IngestionJob) -> None:
+    """Delete the rows a failed job wrote before it failed.
+
+    The staged segment is already gone (SegmentWriter discards it on error),
+    and readers skip rows without a document row, so this only reclaims space
+    and clears the document row if the failure came after publishing.
+    """
+    try:
+        indexing.remove_chunks(delete_document_rows(job.doc_id))
+    except Exception as e:  # noqa: BLE001 - unpublished rows are never read
+        print(f"Warning: Cleaning up ingestion job {job.job_id} failed: {e}")
+
+
+def _parsed_pages(path: str) -> Iterator[str]:
+    try:
+        yield from ingestion.iter_pdf_pages(path)
+    except Exception as exc:  # noqa: BLE001 - reported as PARSE_FAILED
+        raise ParseFailed(str(exc)) from exc
+
+
+def _counted(items: Iterable[T], tally: Counter, key: str) -> Iterator[T]:
+    for item in items:
+        tally[key] += 1
+        yield item
+
+
+def _stored_batches(job_id: str, chunk_rows: Iterator[Tuple]) -> Iterator[List[Tuple]]:
+    """Group chunk rows into batches, writing each to `chunks` before indexing it.
+
+    Pulling the next batch drives the parser, so at most one batch of chunks
+    and its embeddings is held at a time. Each batch renews the job's lease.
+    """
+    for batch in itertools.batched(chunk_rows, max(INGEST_BATCH_SIZE, 1)):
+        with timings.stage("db_insert"):
+            insert_chunks(
+                {
+                    "chunk_id": row[0],
+                    "docs_snapshot_id": row[1],
+                    "doc_id": row[2],
+                    "doc_sha256": row[3],
+                    "page_num": row[4],
+                    "chunk_index": row[5],
+                    "char_start": row[6],
+                    "char_end": row[7],
+                    "chunk_text": row[8],
+                    "parse_mode": row[9],
+                }
+                for row in batch
+            )
+            touch_ingestion_job(job_id, ingestion.utc_now())
+        yield list(batch)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max(INGEST_WORKERS, 1), thread_name_prefix="ingest"
+            )
+        return _executor
@@ -0,0 +1,300 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .ann import IVFIndex
+from .config import IVF_NPROBE, LOCAL_INDEX_CACHE_SIZE
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+class Bm25Index:
+    """BM25 postings in CSR layout: term -> rows[offsets[t]:offsets[t + 1]].
+
+    Rows are numbered in insertion order, so an index extended with
+    `from_texts(texts, base=...)` keeps the row ids of `base` unchanged.
+    """
+
+    def __init__(
+        self,
+        terms: List[str],
+        offsets: np.ndarray,
+        rows: np.ndarray,
+        tfs: np.ndarray,
+        doc_lens: np.ndarray,
+    ) -> None:
+        self.terms = terms
+        self.term_ids = {term: i for i, term in enumerate(terms)}
+        self.offsets = offsets
+        self.rows = rows
+        self.tfs = tfs
+        self.doc_lens = doc_lens
+        self.size = doc_lens.shape[0]
+        self.avg_doc_len = float(doc_lens.mean()) if self.size else 0.0
+        df = np.diff(offsets).astype(np.float64)
+        self.idf = np.log(1 + (self.size - df + 0.5) / (df + 0.5))
+
+    @classmethod
+    def from_texts(cls, texts: Sequence[str], base: Optional["Bm25Index"] = None) -> "Bm25Index":
+        builder = Bm25Builder(base)
+        builder.add(texts)
+        return builder.build()
+
+    def search(self, query_tokens: List[str], k: int) -> List[Tuple[int, float]]:
+        """Top-k (row, score); work is proportional to the postings touched."""
+        term_ids = [self.term_ids[t] for t in set(query_tokens) if t in self.term_ids]
+        if not term_ids or k <= 0:
+            return []
+        rows = np.concatenate([self.rows[self.offsets[t] : self.offsets[t + 1]] for t in term_ids])
+        tfs = np.concatenate([self.tfs[self.offsets[t] : self.offsets[t + 1]] for t in term_ids])
+        idf = np.repeat(self.idf[term_ids], np.diff(self.offsets)[term_ids])
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lens[rows] / (self.avg_doc_len or 1.0))
+        contrib = idf * tfs * (BM25_K1 + 1) / (tfs + norm)
+
+        hit_rows, inverse = np.unique(rows, return_inverse=True)
+        scores = np.bincount(inverse, weights=contrib)
+        top = min(k, hit_rows.shape[0])
+        best = np.argpartition(-scores, top - 1)[:top]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return list(zip(hit_rows[best].tolist(), scores[best].tolist()))
+
+
+class Bm25Builder:
+    """Accumulates BM25 postings batch by batch, optionally on top of `base`.
+
+    Each `add` call stores its postings as flat int32 (term id, row, tf)
+    arrays; `build` merges them into CSR once, so a builder holds about
+    12 bytes per posting plus the vocabulary.
+    """
+
+    def __init__(self, base: Optional[Bm25Index] = None) -> None:
+        self.term_ids: Dict[str, int] = {}
+        self._batches: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        self._doc_lens: List[np.ndarray] = []
+        self._rows = 0
+        if base is not None:
+            self.term_ids = dict(base.term_ids)
+            term_col = np.repeat(
+                np.arange(len(base.terms), dtype=np.int32), np.diff(base.offsets)
+            )
+            self._batches.append((term_col, base.rows.astype(np.int32), base.tfs.astype(np.int32)))
+            self._doc_lens.append(base.doc_lens.astype(np.int32))
+            self._rows = base.size
+
+    def add(self, texts: Iterable[str]) -> None:
+        term_col: List[int] = []
+        row_col: List[int] = []
+        tf_col: List[int] = []
+        doc_lens: List[int] = []
+        for text in texts:
+            tokens = tokenize(text)
+            doc_lens.append(len(tokens))
+            counts: Dict[str, int] = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for term, tf in counts.items():
+                term_col.append(self.term_ids.setdefault(term, len(self.term_ids)))
+                row_col.append(self._rows)
+                tf_col.append(tf)
+            self._rows += 1
+        if not doc_lens:
+            return
+        self._batches.append(
+            (
+                np.asarray(term_col, dtype=np.int32),
+                np.asarray(row_col, dtype=np.int32),
+                np.asarray(tf_col, dtype=np.int32),
+            )
+        )
+        self._doc_lens.append(np.asarray(doc_lens, dtype=np.int32))
+
+    def build(self) -> Bm25Index:
+        terms = list(self.term_ids)
+        if self._batches:
+            term_col, rows, tfs = (np.concatenate(col) for col in zip(*self._batches))
+        else:
+            term_col = rows = tfs = np.zeros(0, dtype=np.int32)
+        # Stable, so each term's rows stay in insertion (ascending) order.
+        order = np.argsort(term_col, kind="stable")
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_col, minlength=len(terms)), out=offsets[1:])
+        doc_lens = (
+            np.concatenate(self._doc_lens) if self._doc_lens else np.zeros(0, dtype=np.int32)
+        )
+        return Bm25Index(terms, offsets, rows[order], tfs[order], doc_lens)
+
+
+class LocalIndex:
+    """In-process hybrid index for a single docs_snapshot_id.
+
+    Holds a BM25 inverted index over chunk text and a contiguous, row-major
+    matrix of L2-normalized embeddings. Built once from the snapshot's index
+    records and reused across queries. When `matrix` is given (e.g. a mapped
+    on-disk segment) its rows must already be normalized and line up with
+    `records`, which then need no `embedding_vector`. An optional `ivf` index
+    over that matrix replaces the exact scan with an approximate one, and a
+    prebuilt `lexical` index with the same row order skips tokenization.
+    """
+
+    def __init__(
+        self,
+        records: List[Dict],
+        matrix: Optional[np.ndarray] = None,
+        ivf: Optional[IVFIndex] = None,
+        lexical: Optional[Bm25Index] = None,
+    ) -> None:
+        self.size = len(records)
+        self.meta: List[Dict] = [
+            {
+                "chunk_id": rec["chunk_id"],
+                "docs_snapshot_id": rec["docs_snapshot_id"],
+                "doc_id": rec["doc_id"],
+                "doc_name": rec.get("doc_name"),
+                "page_num": rec["page_num"],
+                "chunk_index": rec["chunk_index"],
+                "chunk_text": rec["chunk_text"],
+            }
+            for rec in records
+        ]
+        if lexical is None:
+            lexical = Bm25Index.from_texts([rec["chunk_text"] for rec in records])
+        self.lexical = lexical
+        if matrix is None:
+            dim = len(records[0]["embedding_vector"]) if records else 0
+            matrix = normalize_rows([rec["embedding_vector"] for rec in records], dim)
+        self.matrix = matrix
+        self.dim = matrix.shape[1]
+        self.ivf = ivf
+
+    def bm25_search(self, query_tokens: List[str], k: int) -> List[Tuple[int, float]]:
+        return self.lexical.search(query_tokens, k)
+
+    def vector_search(self, query_vector: Sequence[float], k: int) -> List[Tuple[int, float]]:
+        return self.vector_search_batch([query_vector], k)[0]
+
+    def vector_search_batch(
+        self, query_vectors: Sequence[Sequence[float]], k: int
+    ) -> List[List[Tuple[int, float]]]:
+        if not self.size or not self.dim:
+            return [[] for _ in query_vectors]
+        queries = normalize_rows(query_vectors, self.dim)
+        if self.ivf is not None:
+            rows, scores = self.ivf.search(self.matrix, queries, k, IVF_NPROBE)
+        else:
+            rows, scores = top_k_cosine(self.matrix, queries, k)
+        return [
+            [(row, score) for row, score in zip(row_ids.tolist(), row_scores.tolist()) if row >= 0]
+            for row_ids, row_scores in zip(rows, scores)
+        ]
+
+    def vector_score(self, row: int, query_vector: Sequence[float]) -> float:
+        if not self.dim:
+            return 0.0
+        query = normalize_rows([query_vector], self.dim)[0]
+        return float(self.matrix[row] @ query)
+
+
+def normalize_rows(vectors: Sequence[Sequence[float]], dim: int) -> np.ndarray:
+    """Stack vectors into a float32 (n, dim) matrix with unit-length rows.
+
+    Vectors are truncated or zero-padded to `dim`; all-zero rows stay zero.
+    """
+    matrix = np.zeros((len(vectors), dim), dtype=np.float32)
+    for row, vector in enumerate(vectors):
+        values = np.asarray(vector, dtype=np.float32)[:dim]
+        matrix[row, : values.shape[0]] = values
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def top_k_cosine(
+    matrix: np.ndarray, queries: np.ndarray, k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-k rows of a normalized matrix for each normalized query row.
+
+    Returns (row_ids, scores), each shaped (n_queries, min(k, n_rows)) and
+    sorted by descending score.
+    """
+    n_rows = matrix.shape[0]
+    k = min(k, n_rows)
+    if k <= 0:
+        empty = np.empty((queries.shape[0], 0))
+        return empty.astype(np.int64), empty.astype(np.float32)
+    scores = queries @ matrix.T
+    if k < n_rows:
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        part = np.broadcast_to(np.arange(n_rows), (queries.shape[0], n_rows))
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind="stable")
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(part_scores, order, axis=1)
+
+
+_cache: "OrderedDict[str, Tuple[Hashable, LocalIndex]]" = OrderedDict()
+_cache_lock = threading.Lock()
+_build_locks: Dict[str, threading.Lock] = {}
+# Bumped by `invalidate`; a build that started before the bump is not cached.
+_epoch = 0
+_generations: Dict[str, int] = {}
+
+
+def get_local_index(
+    docs_snapshot_id: str,
+    builder: Callable[[], Optional[LocalIndex]],
+    version: Hashable = None,
+) -> Optional[LocalIndex]:
+    """Return the cached index for a snapshot, calling `builder` on a miss.
+
+    `version` identifies the data the index is built from (e.g. the on-disk
+    segment's identity); a cached index with another version is rebuilt, so
+    writes by other processes are picked up without an invalidation.
+    Empty snapshots (builder returns None) are not cached so that a later
+    ingest is picked up without an explicit invalidation.
+    """
+    with _cache_lock:
+        entry = _cache.get(docs_snapshot_id)
+        if entry is not None and entry[0] == version:
+            _cache.move_to_end(docs_snapshot_id)
+            return entry[1]
+        build_lock = _build_locks.setdefault(docs_snapshot_id, threading.Lock())
+
+    with build_lock:
+        with _cache_lock:
+            entry = _cache.get(docs_snapshot_id)
+            generation = (_epoch, _generations.get(docs_snapshot_id, 0))
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        index = builder()
+        if index is None:
+            return None
+        with _cache_lock:
+            if generation != (_epoch, _generations.get(docs_snapshot_id, 0)):
+                return index  # invalidated mid-build; serve it once, do not cache it
+            _cache[docs_snapshot_id] = (version, index)
+            _cache.move_to_end(docs_snapshot_id)
+            while len(_cache) > LOCAL_INDEX_CACHE_SIZE:
+                evicted, _ = _cache.popitem(last=False)
+                _build_locks.pop(evicted, None)
+        return index
+
+
+def invalidate(docs_snapshot_id: Optional[str] = None) -> None:
+    global _epoch
+    with _cache_lock:
+        if docs_snapshot_id is None:
+            _epoch += 1
+            _cache.clear()
+        else:
+            _generations[docs_snapshot_id] = _generations.get(docs_snapshot_id, 0) + 1
+            _cache.pop(docs_snapshot_id, None)
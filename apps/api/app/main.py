@@ -2,13 +2,25 @@ import os
 import time
 import uuid
 
-from fastapi import FastAPI, File, Header, HTTPException, UploadFile
+from fastapi import FastAPI, File, Header, HTTPException, Response, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
 
-from . import indexing, ingestion, policy, retrieval
+from . import (
+    doc_metadata,
+    ingestion,
+    jobs,
+    policy,
+    profiling,
+    prometheus,
+    query_cache,
+    retrieval,
+    snapshots,
+    timings,
+)
 from .config import (
     CONF_MIN,
     DATA_DIR,
+    INDEX_DIR,
     METRICS_ADMIN_TOKEN,
     MODEL_ID,
     PARSER_MODE,
@@ -17,10 +29,15 @@ from .config import (
     RETRIEVAL_VERSION,
     ALLOWED_ORIGINS,
 )
-from .db import Chunk, Document, get_doc_name, get_latest_docs_snapshot_id, insert_chunks, insert_document, init_db
+from .db import (
+    find_documents_by_sha256,
+    get_ingestion_job,
+    init_db,
+)
 from .indexing import ensure_index
 from .schemas import AskRequest, AskResponse, Citation
-from .telemetry import compute_metrics, load_window_telemetry, record_telemetry
+from .metrics import window_metrics
+from .telemetry import dropped_events, record_stages, record_telemetry, shutdown_telemetry
 
 app = FastAPI(title="DocQ&A API", version="0.0.0")
 
@@ -51,6 +68,21 @@ def startup_event():
     # Bootstrap data directories
     os.makedirs(DATA_DIR, exist_ok=True)
     os.makedirs(RAW_DIR, exist_ok=True)
+    os.makedirs(INDEX_DIR, exist_ok=True)
+
+    # Pick up uploads queued before the last shutdown
+    try:
+        jobs.resume_queued_jobs()
+    except Exception as e:
+        print(f"Warning: Resuming ingestion jobs failed: {e}")
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    jobs.shutdown()
+    ingestion.shutdown_parse_pool()
+    shutdown_telemetry()
+    prometheus.shutdown_prometheus()
 
 
 @app.get("/healthz")
@@ -58,72 +90,70 @@ def healthz() -> dict:
     return {"status": "ok"}
 
 
-@app.post("/v1/docs/upload")
-async def upload_doc(file: UploadFile = File(...)) -> dict:
-    data = await file.read()
-    if not data:
-        raise HTTPException(status_code=400, detail="Empty upload.")
+@app.post("/v1/docs/upload", status_code=202)
+def upload_doc(response: Response, file: UploadFile = File(...)) -> dict:
+    # Sync handler: runs in the threadpool, so the copy to disk and the DB
+    # calls stay off the event loop.
+    with profiling.profiled("upload"), timings.collect() as timer:
+        try:
+            return _upload_doc(response, file)
+        finally:
+            record_stages("upload", timer.rounded())
 
-    doc_id = uuid.uuid4().hex
-    doc_sha256 = ingestion.compute_sha256(data)
-    docs_snapshot_id = ingestion.docs_snapshot_id_for(doc_sha256)
-    storage_path = ingestion.save_raw_pdf(doc_id, file.filename or "upload.pdf", data)
 
+def _upload_doc(response: Response, file: UploadFile) -> dict:
+    staged_path, doc_sha256, size = ingestion.stage_upload(file.file)
     try:
-        pages = ingestion.parse_pdf_pages(storage_path)
-    except Exception as exc:  # noqa: BLE001 - returns structured parse error
-        raise HTTPException(status_code=400, detail=f"PARSE_FAILED: {exc}") from exc
-
-    chunk_rows = ingestion.build_chunk_rows(doc_id, doc_sha256, docs_snapshot_id, pages)
-    insert_chunks(
-        Chunk(
-            chunk_id=row[0],
-            docs_snapshot_id=row[1],
-            doc_id=row[2],
-            doc_sha256=row[3],
-            page_num=row[4],
-            chunk_index=row[5],
-            char_start=row[6],
-            char_end=row[7],
-            chunk_text=row[8],
-            parse_mode=row[9],
-        )
-        for row in chunk_rows
-    )
-    insert_document(
-        Document(
-            doc_id=doc_id,
-            doc_sha256=doc_sha256,
-            doc_name=file.filename or "upload.pdf",
-            storage_path=storage_path,
-            ingested_at_utc=ingestion.utc_now(),
-            docs_snapshot_id=docs_snapshot_id,
-        )
-    )
-
-    indexing.index_chunk_rows(
-        doc_id=doc_id,
-        doc_name=file.filename or "upload.pdf",
-        docs_snapshot_id=docs_snapshot_id,
-        chunk_rows=chunk_rows,
-    )
-
-    return {
-        "doc_id": doc_id,
-        "doc_sha256": doc_sha256,
-        "docs_snapshot_id": docs_snapshot_id,
-    }
+        if not size:
+            raise HTTPException(status_code=400, detail="Empty upload.")
+        prometheus.UPLOAD_BYTES.observe(size)
+
+        doc_name = file.filename or "upload.pdf"
+        docs_snapshot_id = ingestion.docs_snapshot_id_for(doc_sha256)
+        for prior in find_documents_by_sha256(doc_sha256):
+            if ingestion.same_ingest_config(prior, chunking_only=False):
+                response.status_code = 200
+                return {
+                    "doc_id": prior.doc_id,
+                    "doc_sha256": doc_sha256,
+                    "docs_snapshot_id": prior.docs_snapshot_id,
+                    "deduplicated": True,
+                }
+
+        job = jobs.find_active_job(doc_sha256)
+        if job is None:
+            job = jobs.create_job(doc_name, staged_path, doc_sha256, docs_snapshot_id)
+        return {**jobs.job_payload(job), "deduplicated": False}
+    finally:
+        # No-op once create_job has moved the file into RAW_DIR.
+        ingestion.discard_staged_upload(staged_path)
+
+
+@app.get("/v1/docs/jobs/{job_id}")
+def get_upload_job(job_id: str) -> dict:
+    job = get_ingestion_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return jobs.job_payload(job)
 
 
 @app.post("/v1/ask", response_model=AskResponse)
 def ask(payload: AskRequest) -> AskResponse:
+    with profiling.profiled("ask"), timings.collect():
+        return _answer(payload)
+
+
+def _answer(payload: AskRequest) -> AskResponse:
     start_time = time.perf_counter()
     question = payload.question.strip()
     if not question:
         raise HTTPException(status_code=400, detail="Question is required.")
 
     request_id = str(uuid.uuid4())
-    docs_snapshot_id = payload.docs_snapshot_id or get_latest_docs_snapshot_id() or "none"
+    with timings.stage("snapshot"):
+        docs_snapshot_id = (
+            payload.docs_snapshot_id or snapshots.latest_docs_snapshot_id() or "none"
+        )
     version_snapshot = {
         "request_id": request_id,
         "docs_snapshot_id": docs_snapshot_id,
@@ -133,7 +163,9 @@ def ask(payload: AskRequest) -> AskResponse:
         "parser_mode": PARSER_MODE,
     }
 
-    if policy.is_injection_attempt(question):
+    with timings.stage("injection_check"):
+        injection = policy.is_injection_attempt(question)
+    if injection:
         return _emit_refusal(
             request_id=request_id,
             docs_snapshot_id=docs_snapshot_id,
@@ -144,7 +176,14 @@ def ask(payload: AskRequest) -> AskResponse:
             start_time=start_time,
         )
 
-    results = retrieval.hybrid_search(question, docs_snapshot_id)
+    with timings.stage("cache"):
+        results = query_cache.get(question, docs_snapshot_id)
+    cache_hit = results is not None
+    if not cache_hit:
+        results = retrieval.hybrid_search(question, docs_snapshot_id)
+        with timings.stage("cache"):
+            query_cache.put(question, docs_snapshot_id, results)
+    prometheus.RETRIEVAL_RESULTS.observe(len(results))
     if not results or results[0]["rrf_score"] == 0.0:
         return _emit_refusal(
             request_id=request_id,
@@ -154,6 +193,7 @@ def ask(payload: AskRequest) -> AskResponse:
             reason="No supporting evidence found.",
             failure_label="NO_EVIDENCE",
             start_time=start_time,
+            cache_hit=cache_hit,
         )
 
     top_chunk = results[0]
@@ -167,16 +207,18 @@ def ask(payload: AskRequest) -> AskResponse:
             reason="Insufficient retrieval confidence.",
             failure_label="LOW_CONFIDENCE",
             start_time=start_time,
+            cache_hit=cache_hit,
         )
 
-    citation = Citation(
-        doc_id=top_chunk["doc_id"],
-        doc_name=top_chunk.get("doc_name") or _doc_name_for(top_chunk["doc_id"]),
-        page_num=top_chunk["page_num"],
-        chunk_id=top_chunk["chunk_id"],
-        snippet=_snippet_for(top_chunk["chunk_text"]),
-        score=round(top_score, 4),
-    )
+    with timings.stage("citation"):
+        citation = Citation(
+            doc_id=top_chunk["doc_id"],
+            doc_name=top_chunk.get("doc_name") or _doc_name_for(top_chunk["doc_id"]),
+            page_num=top_chunk["page_num"],
+            chunk_id=top_chunk["chunk_id"],
+            snippet=_snippet_for(top_chunk["chunk_text"]),
+            score=round(top_score, 4),
+        )
     answer_text = f"Based on the document, {citation.snippet}"
 
     response = AskResponse(
@@ -194,16 +236,48 @@ def ask(payload: AskRequest) -> AskResponse:
         refusal_code=None,
         failure_label=None,
         start_time=start_time,
+        cache_hit=cache_hit,
     )
     return response
 
 
 @app.get("/v1/metrics")
 def metrics(x_admin_token: str | None = Header(default=None)) -> dict:
-    if METRICS_ADMIN_TOKEN and x_admin_token != METRICS_ADMIN_TOKEN:
+    _require_admin(x_admin_token)
+    return {**window_metrics(), "telemetry_dropped_events": dropped_events()}
+
+
+@app.get("/metrics")
+def prometheus_metrics(
+    x_admin_token: str | None = Header(default=None),
+    authorization: str | None = Header(default=None),
+) -> Response:
+    # Scrapers usually send the token as a bearer credential.
+    bearer = authorization.removeprefix("Bearer ") if authorization else None
+    _require_admin(x_admin_token or bearer)
+    return Response(content=prometheus.render(), media_type=prometheus.CONTENT_TYPE)
+
+
+@app.get("/v1/admin/profiles")
+def list_profiles(x_admin_token: str | None = Header(default=None)) -> dict:
+    _require_admin(x_admin_token)
+    return {"profiles": profiling.list_profiles()}
+
+
+@app.get("/v1/admin/profiles/{profile_id}/{view}")
+def get_profile(
+    profile_id: str, view: str, x_admin_token: str | None = Header(default=None)
+) -> Response:
+    _require_admin(x_admin_token)
+    text = profiling.read_profile(profile_id, view)
+    if text is None:
+        raise HTTPException(status_code=404, detail="Profile not found.")
+    return Response(content=text, media_type="text/plain; charset=utf-8")
+
+
+def _require_admin(token: str | None) -> None:
+    if METRICS_ADMIN_TOKEN and token != METRICS_ADMIN_TOKEN:
         raise HTTPException(status_code=401, detail="Unauthorized.")
-    rows = load_window_telemetry()
-    return compute_metrics(rows)
 
 
 def _snippet_for(chunk_text: str, limit: int = 200) -> str:
@@ -211,7 +285,7 @@ def _snippet_for(chunk_text: str, limit: int = 200) -> str:
 
 
 def _doc_name_for(doc_id: str) -> str:
-    return get_doc_name(doc_id) or "unknown"
+    return doc_metadata.doc_name(doc_id) or "unknown"
 
 
 def _record_request(
@@ -222,8 +296,13 @@ def _record_request(
     refusal_code: str | None,
     failure_label: str | None,
     start_time: float,
+    cache_hit: bool = False,
 ) -> None:
-    latency_ms = int((time.perf_counter() - start_time) * 1000)
+    latency_s = time.perf_counter() - start_time
+    latency_ms = int(latency_s * 1000)
+    timer = timings.current()
+    prometheus.ASK_REQUESTS.inc(refusal_code=refusal_code or "none")
+    prometheus.ASK_LATENCY.observe(latency_s, cache_hit=str(cache_hit).lower())
     record_telemetry(
         request_id=request_id,
         docs_snapshot_id=docs_snapshot_id,
@@ -236,9 +315,10 @@ def _record_request(
         tokens_in=0,
         tokens_out=0,
         cost_est=0.0,
-        cache_hit=False,
+        cache_hit=cache_hit,
         refusal_code=refusal_code,
         failure_label=failure_label,
+        stage_latency_ms=timer.rounded() if timer is not None else {},
     )
 
 
@@ -251,6 +331,7 @@ def _emit_refusal(
     reason: str,
     failure_label: str,
     start_time: float,
+    cache_hit: bool = False,
 ) -> AskResponse:
     response = AskResponse(
         request_id=request_id,
@@ -267,6 +348,7 @@ def _emit_refusal(
         refusal_code=refusal_code,
         failure_label=failure_label,
         start_time=start_time,
+        cache_hit=cache_hit,
     )
     return response
 
@@ -0,0 +1,308 @@
+"""Rolling request metrics for /v1/metrics."""
+
+import json
+import math
+import threading
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional, Set
+
+from .db import (
+    delete_telemetry_minutes_before,
+    load_telemetry_minutes,
+    load_worker_telemetry_minutes,
+    upsert_telemetry_minutes,
+)
+
+SKETCH_RELATIVE_ACCURACY = 0.01
+WINDOW_HOURS = 24
+# Minutes a process keeps its own buckets after their last write. A later
+# record for an evicted minute reloads that minute's persisted row first.
+_RETAIN_MINUTES = 5
+# Rows older than the window (plus this margin) are deleted about once an hour.
+_PRUNE_MARGIN = timedelta(hours=1)
+_PRUNE_INTERVAL = timedelta(hours=1)
+
+_GAMMA = (1 + SKETCH_RELATIVE_ACCURACY) / (1 - SKETCH_RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+
+WORKER_ID = uuid.uuid4().hex
+STAGE_KINDS = ("ask", "upload", "ingest")
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch over non-negative values."""
+
+    def __init__(self, bins: Optional[Dict[int, int]] = None, zero_count: int = 0) -> None:
+        self.bins: Dict[int, int] = bins or {}
+        self.zero_count = zero_count
+
+    @property
+    def count(self) -> int:
+        return self.zero_count + sum(self.bins.values())
+
+    def add(self, value: float) -> None:
+        if value <= 0:
+            self.zero_count += 1
+            return
+        index = math.ceil(math.log(value) / _LOG_GAMMA)
+        self.bins[index] = self.bins.get(index, 0) + 1
+
+    def merge(self, other: "QuantileSketch") -> None:
+        self.zero_count += other.zero_count
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+
+    def quantile(self, q: float) -> float:
+        total = self.count
+        if not total:
+            return 0.0
+        rank = q * (total - 1)
+        seen = self.zero_count
+        if seen > rank:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                return 2 * _GAMMA**index / (_GAMMA + 1)
+        return 2 * _GAMMA ** max(self.bins) / (_GAMMA + 1)
+
+    def to_json(self) -> str:
+        return json.dumps({"zero": self.zero_count, "bins": self.bins})
+
+    @classmethod
+    def from_json(cls, payload: str) -> "QuantileSketch":
+        data = json.loads(payload or "{}")
+        bins = {int(index): count for index, count in (data.get("bins") or {}).items()}
+        return cls(bins=bins, zero_count=data.get("zero", 0))
+
+
+class MinuteBucket:
+    def __init__(self, minute_utc: str) -> None:
+        self.minute_utc = minute_utc
+        self.request_count = 0
+        self.cost_sum = 0.0
+        self.cache_hits = 0
+        self.refusals: Counter = Counter()
+        self.latency = QuantileSketch()
+        self.stages: Dict[str, QuantileSketch] = {}
+        self.first_timestamp_utc: Optional[str] = None
+        self.last_timestamp_utc: Optional[str] = None
+        # Bumped on every change; tells a persisted snapshot from a stale one.
+        self.version = 0
+
+    def add(self, row: Dict) -> None:
+        self.request_count += 1
+        self.cost_sum += row["cost_est"]
+        self.cache_hits += 1 if row["cache_hit"] else 0
+        if row["refusal_code"]:
+            self.refusals[row["refusal_code"]] += 1
+        self.latency.add(row["latency_ms"])
+        self.add_stages("ask", json.loads(row.get("stage_latency_json") or "{}"))
+        self._widen(row["timestamp_utc"], row["timestamp_utc"])
+
+    def add_stages(self, kind: str, stages_ms: Dict[str, float]) -> None:
+        for name, ms in stages_ms.items():
+            key = f"{kind}.{name}"
+            sketch = self.stages.get(key)
+            if sketch is None:
+                sketch = self.stages[key] = QuantileSketch()
+            sketch.add(ms)
+        self.version += 1
+
+    def merge(self, other: "MinuteBucket") -> None:
+        self.request_count += other.request_count
+        self.cost_sum += other.cost_sum
+        self.cache_hits += other.cache_hits
+        self.refusals.update(other.refusals)
+        self.latency.merge(other.latency)
+        for key, sketch in other.stages.items():
+            self.stages.setdefault(key, QuantileSketch()).merge(sketch)
+        self._widen(other.first_timestamp_utc, other.last_timestamp_utc)
+
+    def to_row(self) -> Dict:
+        return {
+            "minute_utc": self.minute_utc,
+            "worker_id": WORKER_ID,
+            "request_count": self.request_count,
+            "cost_sum": self.cost_sum,
+            "cache_hits": self.cache_hits,
+            "refusals_json": json.dumps(dict(self.refusals)),
+            "latency_sketch": self.latency.to_json(),
+            "stage_sketches_json": json.dumps(
+                {key: sketch.to_json() for key, sketch in self.stages.items()}
+            ),
+            "first_timestamp_utc": self.first_timestamp_utc,
+            "last_timestamp_utc": self.last_timestamp_utc,
+        }
+
+    @classmethod
+    def from_row(cls, row) -> "MinuteBucket":
+        bucket = cls(row.minute_utc)
+        bucket.request_count = row.request_count
+        bucket.cost_sum = row.cost_sum
+        bucket.cache_hits = row.cache_hits
+        bucket.refusals = Counter(json.loads(row.refusals_json or "{}"))
+        bucket.latency = QuantileSketch.from_json(row.latency_sketch)
+        bucket.stages = {
+            key: QuantileSketch.from_json(payload)
+            for key, payload in json.loads(row.stage_sketches_json or "{}").items()
+        }
+        bucket.first_timestamp_utc = row.first_timestamp_utc
+        bucket.last_timestamp_utc = row.last_timestamp_utc
+        return bucket
+
+    def _widen(self, first: Optional[str], last: Optional[str]) -> None:
+        if first and (self.first_timestamp_utc is None or first < self.first_timestamp_utc):
+            self.first_timestamp_utc = first
+        if last and (self.last_timestamp_utc is None or last > self.last_timestamp_utc):
+            self.last_timestamp_utc = last
+
+
+_buckets: Dict[str, MinuteBucket] = {}
+_dirty: Set[str] = set()
+_lock = threading.Lock()
+# Minutes before this may have been evicted and have a persisted row.
+_evicted_before = ""
+_last_prune: Optional[datetime] = None
+
+
+def record(rows: Iterable[Dict]) -> None:
+    """Fold telemetry rows into this process's buckets."""
+    rows = list(rows)
+    with _lock:
+        evicted = {
+            minute
+            for minute in (_minute_of(row["timestamp_utc"]) for row in rows)
+            if minute < _evicted_before and minute not in _buckets
+        }
+    unavailable = _reload(evicted) if evicted else set()
+    now_utc = datetime.now(timezone.utc).isoformat()
+    with _lock:
+        for row in rows:
+            timestamp = row["timestamp_utc"]
+            # Counting it now beats overwriting the minute's persisted row.
+            if _minute_of(timestamp) in unavailable:
+                timestamp = now_utc
+            _bucket_for(timestamp).add(row)
+
+
+def _reload(minutes: Set[str]) -> Set[str]:
+    """Restore evicted buckets from `telemetry_minutes`; returns the minutes it could not."""
+    try:
+        persisted = load_worker_telemetry_minutes(WORKER_ID, sorted(minutes))
+    except Exception as e:  # noqa: BLE001 - callers fold the rows into the current minute
+        print(f"Warning: Reloading metrics buckets failed: {e}")
+        return set(minutes)
+    with _lock:
+        for row in persisted:
+            _buckets.setdefault(row.minute_utc, MinuteBucket.from_row(row))
+    return set()
+
+
+def record_stages(kind: str, stages_ms: Dict[str, float]) -> None:
+    """Fold one upload's or ingest job's stage timings into the current minute."""
+    if not stages_ms:
+        return
+    with _lock:
+        _bucket_for(datetime.now(timezone.utc).isoformat()).add_stages(kind, stages_ms)
+
+
+def _bucket_for(timestamp_utc: str) -> MinuteBucket:
+    # Caller holds _lock.
+    minute = _minute_of(timestamp_utc)
+    bucket = _buckets.get(minute)
+    if bucket is None:
+        bucket = _buckets[minute] = MinuteBucket(minute)
+    _dirty.add(minute)
+    return bucket
+
+
+def persist() -> None:
+    """Upsert the buckets changed since the last call; one caller at a time."""
+    global _evicted_before
+    now = datetime.now(timezone.utc)
+    _prune(now)
+    with _lock:
+        pending = [(_buckets[minute].to_row(), _buckets[minute].version) for minute in _dirty]
+    if not pending:
+        return
+    try:
+        upsert_telemetry_minutes([row for row, _ in pending])
+    except Exception as e:  # noqa: BLE001 - retried with the next write
+        print(f"Warning: Persisting metrics buckets failed: {e}")
+        return
+    cutoff = _minute_of((now - timedelta(minutes=_RETAIN_MINUTES)).isoformat())
+    with _lock:
+        for row, version in pending:
+            # Only clear buckets unchanged since the snapshot was taken.
+            bucket = _buckets.get(row["minute_utc"])
+            if bucket is not None and bucket.version == version:
+                _dirty.discard(row["minute_utc"])
+        for minute in [m for m in _buckets if m < cutoff and m not in _dirty]:
+            del _buckets[minute]
+            _evicted_before = max(_evicted_before, cutoff)
+
+
+def _prune(now: datetime) -> None:
+    global _last_prune
+    if _last_prune is not None and now - _last_prune < _PRUNE_INTERVAL:
+        return
+    _last_prune = now
+    oldest = now - timedelta(hours=WINDOW_HOURS) - _PRUNE_MARGIN
+    try:
+        delete_telemetry_minutes_before(_minute_of(oldest.isoformat()))
+    except Exception as e:  # noqa: BLE001 - retried after the next interval
+        print(f"Warning: Pruning metrics buckets failed: {e}")
+
+
+def window_metrics(hours: int = WINDOW_HOURS) -> Dict:
+    now = datetime.now(timezone.utc)
+    since = _minute_of((now - timedelta(hours=hours)).isoformat())
+    total = MinuteBucket(since)
+    for row in load_telemetry_minutes(since):
+        total.merge(MinuteBucket.from_row(row))
+    stage_latency_ms = _stage_percentiles(total.stages)
+
+    if not total.request_count:
+        return {
+            "window_start_utc": now.isoformat(),
+            "window_end_utc": now.isoformat(),
+            "p50_latency_ms": 0,
+            "p95_latency_ms": 0,
+            "avg_cost_per_query": 0.0,
+            "refusals_by_code": {},
+            "cache_hit_rate": 0.0,
+            "request_count": 0,
+            "stage_latency_ms": stage_latency_ms,
+        }
+    return {
+        "window_start_utc": total.first_timestamp_utc,
+        "window_end_utc": total.last_timestamp_utc,
+        "p50_latency_ms": int(round(total.latency.quantile(0.50))),
+        "p95_latency_ms": int(round(total.latency.quantile(0.95))),
+        "avg_cost_per_query": round(total.cost_sum / total.request_count, 6),
+        "refusals_by_code": dict(total.refusals),
+        "cache_hit_rate": round(total.cache_hits / total.request_count, 4),
+        "request_count": total.request_count,
+        "stage_latency_ms": stage_latency_ms,
+    }
+
+
+def _stage_percentiles(stages: Dict[str, QuantileSketch]) -> Dict[str, Dict]:
+    out: Dict[str, Dict] = {kind: {} for kind in STAGE_KINDS}
+    for key in sorted(stages):
+        kind, _, name = key.partition(".")
+        sketch = stages[key]
+        out.setdefault(kind, {})[name] = {
+            "count": sketch.count,
+            "p50_ms": round(sketch.quantile(0.50), 3),
+            "p95_ms": round(sketch.quantile(0.95), 3),
+        }
+    return out
+
+
+def _minute_of(timestamp_utc: str) -> str:
+    # ISO 8601 UTC timestamps sort lexically; "YYYY-MM-DDTHH:MM" names the minute.
+    return timestamp_utc[:16]
@@ -0,0 +1,172 @@
+"""Opt-in profiling of a sample of /v1/ask and upload requests."""
+
+import contextlib
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional
+
+from .config import PROFILE_DIR, PROFILE_SAMPLE_RATE, PROFILE_TOP_N
+
+# Oldest profiles are removed beyond this many, so sampling cannot fill the disk.
+_MAX_PROFILES = 500
+_PROFILE_ID = re.compile(r"^[0-9TZ]+-[a-z]+-[0-9a-f]{8}$")
+_FILE_SUFFIXES = {"top": ".top.txt", "collapsed": ".collapsed.txt"}
+
+_write_lock = threading.Lock()
+
+
+class _CallTracer:
+    """Exact call-time accounting for the thread that installed it."""
+
+    def __init__(self) -> None:
+        # Frames: [name, started, child_time]
+        self._stack: List[List] = []
+        self._active: Dict[str, int] = defaultdict(int)
+        self.calls: Dict[str, int] = defaultdict(int)
+        self.cumulative_s: Dict[str, float] = defaultdict(float)
+        self.self_s: Dict[str, float] = defaultdict(float)
+        self.stacks_us: Dict[str, float] = defaultdict(float)
+
+    def __call__(self, frame, event: str, arg) -> None:
+        now = time.perf_counter()
+        if event == "call":
+            self._push(_frame_name(frame), now)
+        elif event == "c_call":
+            self._push(_builtin_name(arg), now)
+        elif event in ("return", "c_return", "c_exception") and self._stack:
+            self._pop(now)
+
+    def finish(self) -> None:
+        now = time.perf_counter()
+        while self._stack:
+            self._pop(now)
+
+    def _push(self, name: str, now: float) -> None:
+        self._stack.append([name, now, 0.0])
+        self._active[name] += 1
+        self.calls[name] += 1
+
+    def _pop(self, now: float) -> None:
+        path = ";".join(frame[0] for frame in self._stack)
+        name, started, child_time = self._stack.pop()
+        elapsed = now - started
+        self._active[name] -= 1
+        if not self._active[name]:
+            # Only the outermost activation counts, so recursion is not
+            # double-charged.
+            self.cumulative_s[name] += elapsed
+        own = max(elapsed - child_time, 0.0)
+        self.self_s[name] += own
+        self.stacks_us[path] += own * 1e6
+        if self._stack:
+            self._stack[-1][2] += elapsed
+
+
+@contextlib.contextmanager
+def profiled(kind: str) -> Iterator[None]:
+    if PROFILE_SAMPLE_RATE <= 0 or random.random() >= PROFILE_SAMPLE_RATE:
+        yield
+        return
+    tracer = _CallTracer()
+    previous = sys.getprofile()
+    started = time.perf_counter()
+    # Per-thread, unlike cProfile on 3.12+, so concurrent requests in the
+    # threadpool stay out of this profile.
+    sys.setprofile(tracer)
+    try:
+        yield
+    finally:
+        sys.setprofile(previous)
+        elapsed_s = time.perf_counter() - started
+        tracer.finish()
+        try:
+            _write_profile(kind, tracer, elapsed_s)
+        except OSError as e:
+            print(f"Warning: Writing profile failed: {e}")
+
+
+def list_profiles() -> List[Dict]:
+    try:
+        names = os.listdir(PROFILE_DIR)
+    except FileNotFoundError:
+        return []
+    profiles = []
+    for name in sorted(names, reverse=True):
+        if not name.endswith(_FILE_SUFFIXES["top"]):
+            continue
+        profile_id = name[: -len(_FILE_SUFFIXES["top"])]
+        try:
+            stamp, kind, _ = profile_id.split("-")
+            created = datetime.strptime(stamp, "%Y%m%dT%H%M%S%fZ").replace(tzinfo=timezone.utc)
+        except ValueError:
+            # Not written by _write_profile (e.g. a copied or renamed file).
+            continue
+        profiles.append(
+            {"profile_id": profile_id, "kind": kind, "created_at_utc": created.isoformat()}
+        )
+    return profiles
+
+
+def read_profile(profile_id: str, view: str) -> Optional[str]:
+    """Text of one profile file; None if the id, view or file is unknown."""
+    suffix = _FILE_SUFFIXES.get(view)
+    if suffix is None or not _PROFILE_ID.match(profile_id):
+        return None
+    try:
+        with open(os.path.join(PROFILE_DIR, profile_id + suffix), encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _write_profile(kind: str, tracer: _CallTracer, elapsed_s: float) -> None:
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    profile_id = f"{stamp}-{kind}-{uuid.uuid4().hex[:8]}"
+
+    ranked = sorted(tracer.cumulative_s, key=tracer.cumulative_s.get, reverse=True)
+    lines = [
+        f"# {kind} request, {elapsed_s * 1000:.3f} ms wall clock",
+        f"{'cumulative_ms':>14} {'self_ms':>10} {'calls':>8}  function",
+    ]
+    for name in ranked[: max(PROFILE_TOP_N, 1)]:
+        lines.append(
+            f"{tracer.cumulative_s[name] * 1000:>14.3f} {tracer.self_s[name] * 1000:>10.3f} "
+            f"{tracer.calls[name]:>8}  {name}"
+        )
+    collapsed = [f"{path} {round(us)}" for path, us in sorted(tracer.stacks_us.items())]
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    base = os.path.join(PROFILE_DIR, profile_id)
+    with open(base + _FILE_SUFFIXES["top"], "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    with open(base + _FILE_SUFFIXES["collapsed"], "w", encoding="utf-8") as f:
+        f.write("\n".join(collapsed) + "\n")
+    _prune()
+
+
+def _prune() -> None:
+    with _write_lock:
+        tops = sorted(n for n in os.listdir(PROFILE_DIR) if n.endswith(_FILE_SUFFIXES["top"]))
+        for name in tops[: max(len(tops) - _MAX_PROFILES, 0)]:
+            profile_id = name[: -len(_FILE_SUFFIXES["top"])]
+            for suffix in _FILE_SUFFIXES.values():
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(os.path.join(PROFILE_DIR, profile_id + suffix))
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_firstlineno}({code.co_qualname})"
+
+
+def _builtin_name(func) -> str:
+    module = getattr(func, "__module__", None) or ""
+    qualname = getattr(func, "__qualname__", None) or repr(func)
+    return f"{{{module}.{qualname}}}" if module else f"{{{qualname}}}"
@@ -0,0 +1,240 @@
+"""In-process counters and histograms exposed at /metrics."""
+
+import json
+import math
+import os
+import threading
+import uuid
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .config import PROMETHEUS_DIR, PROMETHEUS_SYNC_INTERVAL_MS
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_LabelKey = Tuple[str, ...]
+
+_lock = threading.Lock()
+_registry: Dict[str, "_Metric"] = {}
+_owner_pid = os.getpid()
+_worker_id = uuid.uuid4().hex
+_dirty = False
+_stop = threading.Event()
+_syncer: Optional[threading.Thread] = None
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.values: Dict[_LabelKey, object] = {}
+        _registry[name] = self
+
+    def _key(self, labels: Dict[str, str]) -> _LabelKey:
+        return tuple(str(labels[label]) for label in self.labels)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with _lock:
+            _claim()
+            self.values[key] = self.values.get(key, 0.0) + amount
+        _ensure_syncer()
+
+    def _merge(self, into: Dict[_LabelKey, object], key: _LabelKey, value) -> None:
+        into[key] = into.get(key, 0.0) + value
+
+    def _render(self, key: _LabelKey, value) -> List[str]:
+        return [f"{self.name}{_labels(self.labels, key)} {_number(value)}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, help_text: str, buckets: Sequence[float], labels: Sequence[str] = ()
+    ) -> None:
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with _lock:
+            _claim()
+            state = self.values.get(key)
+            if state is None:
+                # [per-bucket counts (non-cumulative, last is +Inf), sum]
+                state = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][_bucket_index(self.buckets, value)] += 1
+            state[1] += value
+        _ensure_syncer()
+
+    def _merge(self, into: Dict[_LabelKey, object], key: _LabelKey, value) -> None:
+        counts, total = value
+        if len(counts) != len(self.buckets) + 1:
+            return  # written with different buckets by an older build
+        state = into.setdefault(key, [[0] * len(counts), 0.0])
+        state[0] = [a + b for a, b in zip(state[0], counts)]
+        state[1] += total
+
+    def _render(self, key: _LabelKey, value) -> List[str]:
+        counts, total = value
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            cumulative += count
+            le = "+Inf" if bound == math.inf else _number(bound)
+            label_text = _labels(self.labels + ("le",), key + (le,))
+            lines.append(f"{self.name}_bucket{label_text} {cumulative}")
+        lines.append(f"{self.name}_sum{_labels(self.labels, key)} {_number(total)}")
+        lines.append(f"{self.name}_count{_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+_LATENCY_BUCKETS_S = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+_SIZE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+ASK_REQUESTS = Counter(
+    "docqa_ask_requests_total", "/v1/ask requests by refusal code.", ("refusal_code",)
+)
+ASK_LATENCY = Histogram(
+    "docqa_ask_latency_seconds", "/v1/ask latency.", _LATENCY_BUCKETS_S, ("cache_hit",)
+)
+RETRIEVAL_RESULTS = Histogram(
+    "docqa_retrieval_results", "Results returned by retrieval per /v1/ask.", (0, 1, 2, 3, 5, 10, 20, 50)
+)
+EMBEDDING_DURATION = Histogram(
+    "docqa_embedding_duration_seconds",
+    "embed_texts call duration.",
+    (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+    ("mode",),
+)
+UPLOAD_BYTES = Histogram(
+    "docqa_upload_bytes",
+    "Size of accepted uploads.",
+    tuple(2**power for power in range(16, 30, 2)),
+)
+INGEST_JOBS = Counter("docqa_ingest_jobs_total", "Finished ingestion jobs by status.", ("status",))
+INGEST_PAGES = Histogram("docqa_ingest_pages", "Pages per ingested document.", _SIZE_BUCKETS)
+INGEST_CHUNKS = Histogram("docqa_ingest_chunks", "Chunks per ingested document.", _SIZE_BUCKETS)
+
+
+def render() -> str:
+    """Exposition text for every worker that has written to `PROMETHEUS_DIR`."""
+    sync()
+    merged: Dict[str, Dict[_LabelKey, object]] = {name: {} for name in _registry}
+    try:
+        names = sorted(os.listdir(PROMETHEUS_DIR))
+    except FileNotFoundError:
+        names = []
+    for file_name in names:
+        if not file_name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(PROMETHEUS_DIR, file_name), encoding="utf-8") as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            continue  # removed or replaced between listdir and open
+        for name, values in payload.items():
+            metric = _registry.get(name)
+            if metric is None:
+                continue
+            for key, value in values:
+                metric._merge(merged[name], tuple(key), value)
+
+    lines = []
+    for name, metric in _registry.items():
+        lines.append(f"# HELP {name} {metric.help_text}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        for key in sorted(merged[name]):
+            lines.extend(metric._render(key, merged[name][key]))
+    return "\n".join(lines) + "\n"
+
+
+def sync() -> None:
+    """Write this process's values to its file if they changed."""
+    global _dirty
+    with _lock:
+        if not _dirty:
+            return
+        payload = {
+            name: [[list(key), value] for key, value in metric.values.items()]
+            for name, metric in _registry.items()
+        }
+        path = os.path.join(PROMETHEUS_DIR, f"{_owner_pid}-{_worker_id}.json")
+        _dirty = False
+        text = json.dumps(payload)
+    try:
+        os.makedirs(PROMETHEUS_DIR, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Warning: Writing Prometheus metrics failed: {e}")
+        with _lock:
+            _dirty = True
+
+
+def shutdown_prometheus() -> None:
+    global _syncer
+    syncer, _syncer = _syncer, None
+    if syncer is not None:
+        _stop.set()
+        syncer.join(5.0)
+        _stop.clear()
+    sync()
+
+
+def _claim() -> None:
+    # Caller holds _lock. A forked child starts from zero under its own file
+    # instead of re-reporting what its parent already wrote.
+    global _dirty, _owner_pid, _worker_id, _syncer
+    if os.getpid() != _owner_pid:
+        _owner_pid, _worker_id, _syncer = os.getpid(), uuid.uuid4().hex, None
+        for metric in _registry.values():
+            metric.values.clear()
+    _dirty = True
+
+
+def _ensure_syncer() -> None:
+    global _syncer
+    if _syncer is not None:
+        return
+    with _lock:
+        if _syncer is None:
+            _syncer = threading.Thread(target=_sync_loop, name="prometheus-sync", daemon=True)
+            _syncer.start()
+
+
+def _sync_loop() -> None:
+    interval_s = max(PROMETHEUS_SYNC_INTERVAL_MS, 1) / 1000
+    while not _stop.wait(interval_s):
+        sync()
+
+
+def _bucket_index(buckets: Tuple[float, ...], value: float) -> int:
+    for index, bound in enumerate(buckets):
+        if value <= bound:
+            return index
+    return len(buckets)
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
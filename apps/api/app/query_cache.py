@@ -0,0 +1,99 @@
+"""Retrieval result cache for /v1/ask."""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from . import snapshots
+from .config import (
+    INDEX_VERSION,
+    MODEL_ID,
+    PROMPT_VERSION,
+    QUERY_CACHE_SHARED,
+    QUERY_CACHE_SIZE,
+    QUERY_CACHE_TTL_S,
+    RETRIEVAL_VERSION,
+)
+from .db import get_query_cache_entry, put_query_cache_entry
+
+_entries: "OrderedDict[str, Tuple[float, List[Dict]]]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def normalize_question(question: str) -> str:
+    return " ".join(question.lower().split())
+
+
+def cache_key(question: str, docs_snapshot_id: str) -> str:
+    # A re-ingest replaces the snapshot's documents, so entries citing the
+    # replaced chunks are never looked up again.
+    parts = (
+        normalize_question(question),
+        docs_snapshot_id,
+        snapshots.content_id(docs_snapshot_id),
+        INDEX_VERSION,
+        RETRIEVAL_VERSION,
+        PROMPT_VERSION,
+        MODEL_ID,
+    )
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def get(question: str, docs_snapshot_id: str) -> Optional[List[Dict]]:
+    if QUERY_CACHE_SIZE <= 0:
+        return None
+    key = cache_key(question, docs_snapshot_id)
+    now = time.time()
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None:
+            expires_at, results = entry
+            if expires_at > now:
+                _entries.move_to_end(key)
+                return results
+            del _entries[key]
+
+    if not QUERY_CACHE_SHARED:
+        return None
+    try:
+        row = get_query_cache_entry(key, now)
+    except Exception as e:  # noqa: BLE001 - the shared tier is best effort
+        print(f"Warning: Query cache lookup failed: {e}")
+        return None
+    if row is None:
+        return None
+    payload_json, expires_at = row
+    results = json.loads(payload_json)
+    _store_local(key, results, expires_at)
+    return results
+
+
+def put(question: str, docs_snapshot_id: str, results: List[Dict]) -> None:
+    """Cache non-empty retrieval results; empty ones may change after an ingest."""
+    if QUERY_CACHE_SIZE <= 0 or not results:
+        return
+    key = cache_key(question, docs_snapshot_id)
+    expires_at = time.time() + QUERY_CACHE_TTL_S
+    _store_local(key, results, expires_at)
+    if not QUERY_CACHE_SHARED:
+        return
+    try:
+        put_query_cache_entry(key, json.dumps(results), expires_at)
+    except Exception as e:  # noqa: BLE001 - the shared tier is best effort
+        print(f"Warning: Query cache write failed: {e}")
+
+
+def clear() -> None:
+    with _lock:
+        _entries.clear()
+
+
+def _store_local(key: str, results: List[Dict], expires_at: float) -> None:
+    with _lock:
+        _entries[key] = (expires_at, results)
+        _entries.move_to_end(key)
+        while len(_entries) > QUERY_CACHE_SIZE:
+            _entries.popitem(last=False)
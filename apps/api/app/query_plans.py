@@ -0,0 +1,144 @@
+"""Fail if a db.py accessor's query plan falls back to a full table scan."""
+
+import argparse
+import re
+import sys
+import uuid
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy import event
+
+from . import db
+
+_SNAPSHOT = "snap_plancheck"
+_STATEMENT = re.compile(r"^\s*(SELECT|UPDATE|DELETE)\b", re.IGNORECASE)
+
+
+def _checks() -> List[Tuple[str, Callable[[], object], Tuple[str, ...]]]:
+    """(accessor, call, tables it must not read with a full scan)."""
+    doc_id = f"plancheck-{uuid.uuid4().hex}"
+    document = db.Document(
+        doc_id=doc_id,
+        doc_sha256="0" * 64,
+        doc_name="plancheck.pdf",
+        storage_path="",
+        # Sorts before any real ingest, so the latest snapshot is unaffected.
+        ingested_at_utc="0000",
+        docs_snapshot_id=_SNAPSHOT,
+        parser_mode="",
+        chunk_size=0,
+        chunk_overlap=0,
+        index_version="",
+    )
+    doc_tables = ("documents", "chunks", "index_records")
+    return [
+        ("publish_document", lambda: db.publish_document(document), doc_tables),
+        ("delete_document_rows", lambda: db.delete_document_rows(doc_id), doc_tables),
+        ("get_latest_docs_snapshot_id", db.get_latest_docs_snapshot_id, ("documents",)),
+        ("get_document", lambda: db.get_document(doc_id), ("documents",)),
+        ("load_snapshot_documents", lambda: db.load_snapshot_documents(_SNAPSHOT), ("documents",)),
+        ("load_snapshot_doc_ids", lambda: db.load_snapshot_doc_ids(_SNAPSHOT), ("documents",)),
+        ("find_documents_by_sha256", lambda: db.find_documents_by_sha256("0" * 64), ("documents",)),
+        ("iter_doc_chunks", lambda: list(db.iter_doc_chunks(doc_id, 1)), ("chunks",)),
+        ("load_chunks", lambda: db.load_chunks(_SNAPSHOT), ("chunks", "documents")),
+        (
+            "load_index_records",
+            lambda: db.load_index_records(_SNAPSHOT, with_embeddings=False),
+            ("index_records", "documents"),
+        ),
+        ("get_ingestion_job", lambda: db.get_ingestion_job(doc_id), ("ingestion_jobs",)),
+        (
+            "find_active_ingestion_job",
+            lambda: db.find_active_ingestion_job("0" * 64, "0000"),
+            ("ingestion_jobs",),
+        ),
+        ("load_queued_ingestion_job_ids", db.load_queued_ingestion_job_ids, ("ingestion_jobs",)),
+        ("claim_ingestion_job", lambda: db.claim_ingestion_job(doc_id, "0000"), ("ingestion_jobs",)),
+        ("touch_ingestion_job", lambda: db.touch_ingestion_job(doc_id, "0000"), ("ingestion_jobs",)),
+        (
+            "requeue_stale_ingestion_jobs",
+            lambda: db.requeue_stale_ingestion_jobs("0000", "0000"),
+            ("ingestion_jobs",),
+        ),
+        ("get_query_cache_entry", lambda: db.get_query_cache_entry(doc_id, 0.0), ("query_cache",)),
+        ("load_embedding_cache", lambda: db.load_embedding_cache([doc_id]), ("embedding_cache",)),
+        ("load_telemetry", db.load_telemetry, ("telemetry",)),
+        ("load_telemetry_minutes", lambda: db.load_telemetry_minutes("9999"), ("telemetry_minutes",)),
+        (
+            "load_worker_telemetry_minutes",
+            lambda: db.load_worker_telemetry_minutes(doc_id, ["0000"]),
+            ("telemetry_minutes",),
+        ),
+        (
+            "delete_telemetry_minutes_before",
+            lambda: db.delete_telemetry_minutes_before("0000"),
+            ("telemetry_minutes",),
+        ),
+    ]
+
+
+def check_query_plans() -> List[str]:
+    """Run every accessor once and EXPLAIN what it sent; returns the failures."""
+    failures = []
+    for name, call, tables in _checks():
+        for statement, parameters in _captured(call):
+            for line in _plan(statement, parameters):
+                table = _full_scan(line, tables)
+                if table is not None:
+                    failures.append(f"{name}: full scan of {table}: {line.strip()}")
+    return failures
+
+
+def _captured(call: Callable[[], object]) -> List[Tuple[str, object]]:
+    statements: List[Tuple[str, object]] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany) -> None:
+        if not executemany and _STATEMENT.match(statement):
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, "before_cursor_execute", capture)
+    try:
+        call()
+    finally:
+        event.remove(db.engine, "before_cursor_execute", capture)
+    return statements
+
+
+def _plan(statement: str, parameters) -> List[str]:
+    with db.engine.connect() as conn:
+        if conn.dialect.name == "sqlite":
+            rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+            return [row[-1] for row in rows]
+        # Empty tables make a sequential scan the cheapest plan; this asks
+        # whether an index can serve the query at all.
+        conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        return [row[0] for row in conn.exec_driver_sql(f"EXPLAIN {statement}", parameters).all()]
+
+
+def _full_scan(line: str, tables: Tuple[str, ...]) -> Optional[str]:
+    for table in tables:
+        if re.search(rf"\bSeq Scan on {table}\b", line):
+            return table
+        if re.match(rf"\s*SCAN (TABLE )?{table}\b", line) and "INDEX" not in line:
+            return table
+    return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=(
+            "EXPLAIN each db.py accessor against DB_DATABASE_URL (a scratch database at "
+            "alembic head; one placeholder document is written and deleted)."
+        )
+    )
+    parser.parse_args()
+    failures = check_query_plans()
+    for failure in failures:
+        print(failure)
+    if failures:
+        sys.exit(1)
+    print("All accessor query plans use an index.")
+
+
+if __name__ == "__main__":
+    main()
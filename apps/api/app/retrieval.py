@@ -1,8 +1,6 @@
 import json
-import math
-import re
 import urllib.request
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Sequence, Tuple
 
 from .config import (
     AZURE_SEARCH_API_KEY,
@@ -14,17 +12,27 @@ from .config import (
     TOP_K_BM25,
     TOP_K_VECTOR,
 )
+from . import doc_metadata
 from .db import load_chunks, load_index_records
-from .embeddings import embed_texts
+from .embeddings import decode_embedding, embed_texts
+from .local_index import LocalIndex, get_local_index, tokenize
+from .segments import open_segment, segment_version
+from .timings import stage
 
 
 def hybrid_search(question: str, docs_snapshot_id: Optional[str]) -> List[Dict]:
     if _azure_enabled():
         return _azure_search(question, docs_snapshot_id)
 
-    records = _load_index_records(docs_snapshot_id)
-    if not records:
+    with stage("index_load"):
+        index = get_local_index(
+            docs_snapshot_id or "",
+            lambda: _build_local_index(docs_snapshot_id),
+            version=segment_version(docs_snapshot_id) if docs_snapshot_id else None,
+        )
+    if index is None:
         return _fallback_overlap(question, docs_snapshot_id)
+    return _local_search(question, index)
 
 
 def _azure_enabled() -> bool:
@@ -32,7 +40,8 @@ def _azure_enabled() -> bool:
 
 
 def _azure_search(question: str, docs_snapshot_id: Optional[str]) -> List[Dict]:
-    query_embedding = embed_texts([question])[0]
+    with stage("query_embedding"):
+        query_embedding = embed_texts([question])[0]
     payload = {
         "search": question,
         "vectorQueries": [
@@ -58,7 +67,7 @@ def _azure_search(question: str, docs_snapshot_id: Optional[str]) -> List[Dict]:
             "api-key": AZURE_SEARCH_API_KEY,
         },
     )
-    with urllib.request.urlopen(req) as resp:
+    with stage("remote_search"), urllib.request.urlopen(req) as resp:
         data = json.load(resp)
 
     results = []
@@ -92,8 +101,75 @@ def _apply_rank_scores(
         entry[f"{key}_rank"] = idx
 
 
-def _load_index_records(docs_snapshot_id: Optional[str]) -> List[Dict]:
-    rows = load_index_records(docs_snapshot_id)
+def _local_search(question: str, index: LocalIndex) -> List[Dict]:
+    with stage("lexical_search"):
+        lexical = index.bm25_search(_tokenize(question), TOP_K_BM25)
+    # Fuse even without a BM25 hit: a vector-only match tops out at 0.5, and
+    # CONF_MIN decides whether that is enough evidence.
+    with stage("query_embedding"):
+        query_embedding = embed_texts([question])[0]
+    with stage("vector_search"):
+        vector = index.vector_search(query_embedding, TOP_K_VECTOR)
+    with stage("fusion"):
+        return _fuse(index, lexical, vector, query_embedding)
+
+
+def _fuse(
+    index: LocalIndex,
+    lexical: List[Tuple[int, float]],
+    vector: List[Tuple[int, float]],
+    query_embedding: Sequence[float],
+) -> List[Dict]:
+    bm25_scores = dict(lexical)
+    vector_scores = dict(vector)
+
+    def _candidate(row: int) -> Dict:
+        rec = dict(index.meta[row])
+        rec["bm25_score"] = bm25_scores.get(row, 0.0)
+        if row in vector_scores:
+            rec["vector_score"] = vector_scores[row]
+        else:
+            rec["vector_score"] = index.vector_score(row, query_embedding)
+        return rec
+
+    combined: Dict[str, Dict] = {}
+    _apply_rank_scores(combined, [_candidate(row) for row, _ in lexical], "bm25")
+    _apply_rank_scores(combined, [_candidate(row) for row, _ in vector], "vector")
+
+    # Normalize so a chunk ranked first by both retrievers scores 1.0, which
+    # keeps rrf_score on the same 0..1 scale as CONF_MIN.
+    max_raw = 2 / (RRF_K + 1)
+    fused = sorted(combined.values(), key=lambda x: x["rrf_score_raw"], reverse=True)
+    for rank, entry in enumerate(fused[:TOP_K], start=1):
+        entry["rrf_rank"] = rank
+        entry["rrf_score"] = entry["rrf_score_raw"] / max_raw
+    return fused[:TOP_K]
+
+
+def _build_local_index(docs_snapshot_id: Optional[str]) -> Optional[LocalIndex]:
+    segment = open_segment(docs_snapshot_id) if docs_snapshot_id else None
+    if segment is not None:
+        records = _load_index_records(docs_snapshot_id, with_embeddings=False)
+        positions = {chunk_id: pos for pos, chunk_id in enumerate(segment.chunk_ids)}
+        if len(records) == len(positions) and all(
+            rec["chunk_id"] in positions for rec in records
+        ):
+            records.sort(key=lambda rec: positions[rec["chunk_id"]])
+            return LocalIndex(
+                records, matrix=segment.matrix, ivf=segment.ivf, lexical=segment.lexical
+            )
+        # Segment is stale or partial: fall back to embeddings from the DB.
+
+    records = _load_index_records(docs_snapshot_id)
+    if not records:
+        return None
+    return LocalIndex(records)
+
+
+def _load_index_records(
+    docs_snapshot_id: Optional[str], with_embeddings: bool = True
+) -> List[Dict]:
+    rows = load_index_records(docs_snapshot_id, with_embeddings=with_embeddings)
     records = []
     for row in rows:
         rec = {
@@ -104,17 +180,33 @@ def _load_index_records(docs_snapshot_id: Optional[str]) -> List[Dict]:
             "page_num": row.page_num,
             "chunk_index": row.chunk_index,
             "chunk_text": row.chunk_text,
-            "embedding_vector": json.loads(row.embedding_json),
         }
+        if with_embeddings:
+            rec["embedding_vector"] = _embedding_of(row)
         records.append(rec)
     return records
 
 
+def _embedding_of(row) -> Sequence[float]:
+    if row.embedding_blob is not None:
+        return decode_embedding(row.embedding_blob)
+    # Rows written before binary storage; converted by `python -m app.backfill`.
+    return json.loads(row.embedding_json or "[]")
+
+
 def _fallback_overlap(
     question: str, docs_snapshot_id: Optional[str]
 ) -> List[Dict]:
     query_tokens = _tokenize(question)
-    rows = load_chunks(docs_snapshot_id)
+    with stage("index_load"):
+        rows = load_chunks(docs_snapshot_id)
+    with stage("lexical_search"):
+        return _overlap_top_k(query_tokens, rows, docs_snapshot_id)
+
+
+def _overlap_top_k(
+    query_tokens: List[str], rows: List, docs_snapshot_id: Optional[str]
+) -> List[Dict]:
     scored = []
     for row in rows:
         score = _overlap_score(query_tokens, row.chunk_text)
@@ -132,11 +224,16 @@ def _fallback_overlap(
         entry["rrf_rank"] = 0
         scored.append(entry)
     scored.sort(key=lambda x: x["rrf_score"], reverse=True)
+    # `chunks` has no doc_name; resolve it here so citations need no lookup.
+    with stage("index_load"):
+        doc_metadata.load_snapshot(docs_snapshot_id)
+        for entry in scored[:TOP_K]:
+            entry["doc_name"] = doc_metadata.doc_name(entry["doc_id"])
     return scored[:TOP_K]
 
 
 def _tokenize(text: str) -> List[str]:
-    return re.findall(r"[a-z0-9]+", text.lower())
+    return tokenize(text)
 
 
 def _overlap_score(query_tokens: List[str], text: str) -> float:
@@ -146,13 +243,3 @@ def _overlap_score(query_tokens: List[str], text: str) -> float:
     overlap = sum(1 for t in query_tokens if t in text_tokens)
     return overlap / max(len(query_tokens), 1)
 
-
-def _cosine(vec_a: List[float], vec_b: List[float]) -> float:
-    if not vec_a or not vec_b:
-        return 0.0
-    dot = sum(a * b for a, b in zip(vec_a, vec_b, strict=False))
-    norm_a = math.sqrt(sum(a * a for a in vec_a))
-    norm_b = math.sqrt(sum(b * b for b in vec_b))
-    if norm_a == 0 or norm_b == 0:
-        return 0.0
-    return dot / (norm_a * norm_b)
@@ -0,0 +1,212 @@
+"""On-disk vector segments for the local retrieval path."""
+
+import fcntl
+import json
+import math
+import os
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .ann import IVFIndex, load_ivf, remove_ivf, save_ivf, train_ivf
+from .config import INDEX_DIR, IVF_MIN_ROWS, IVF_NLIST
+from .local_index import Bm25Builder, Bm25Index, normalize_rows
+
+VECTORS_FILE = "vectors.f32"
+CHUNK_IDS_FILE = "chunk_ids.json"
+BM25_POSTINGS_FILE = "bm25_postings.npz"
+BM25_TERMS_FILE = "bm25_terms.json"
+_LOCK_FILE = ".lock"
+
+
+@dataclass
+class Segment:
+    chunk_ids: List[str]
+    matrix: np.ndarray
+    ivf: Optional[IVFIndex] = None
+    lexical: Optional[Bm25Index] = None
+
+    @property
+    def dim(self) -> int:
+        return self.matrix.shape[1]
+
+
+def segment_dir(docs_snapshot_id: str) -> str:
+    return os.path.join(INDEX_DIR, docs_snapshot_id)
+
+
+class SegmentWriter:
+    """Streams rows into a new segment for a snapshot and publishes it on commit.
+
+    A snapshot holds one document's content (its id derives from the content
+    hash), so each ingest writes the segment afresh and the commit replaces
+    whatever was there; a clean exit with no rows removes the segment.
+    Vectors are appended batch by batch to a staging `vectors.f32` and BM25
+    postings are accumulated incrementally, so the caller never holds more
+    than one batch of embeddings. The snapshot stays locked between
+    `__enter__` and `__exit__`; readers keep seeing the previous segment
+    until the commit renames the staged files into place.
+    """
+
+    def __init__(self, docs_snapshot_id: str) -> None:
+        self.path = segment_dir(docs_snapshot_id)
+        self.docs_snapshot_id = docs_snapshot_id
+        self._staging_path = os.path.join(self.path, f"{VECTORS_FILE}.staging")
+        self._lock_file = None
+        self._vectors = None
+        self._chunk_ids: List[str] = []
+        self._dim = 0
+        self._lexical = Bm25Builder()
+        self._rows = 0
+
+    def __enter__(self) -> "SegmentWriter":
+        os.makedirs(self.path, exist_ok=True)
+        self._lock_file = open(os.path.join(self.path, _LOCK_FILE), "w")
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        try:
+            if exc_type is None and self._rows:
+                self._commit()
+            elif exc_type is None:
+                _remove_segment(self.path)
+        finally:
+            if self._vectors is not None:
+                self._vectors.close()
+            if os.path.exists(self._staging_path):
+                os.remove(self._staging_path)
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            self._lock_file.close()
+
+    def add(
+        self,
+        chunk_ids: Sequence[str],
+        embeddings: Sequence[Sequence[float]],
+        texts: Sequence[str],
+    ) -> None:
+        if not chunk_ids:
+            return
+        if self._vectors is None:
+            self._start(len(embeddings[0]))
+        rows = normalize_rows(embeddings, self._dim)
+        self._vectors.write(rows.astype("<f4").tobytes())
+        self._chunk_ids.extend(chunk_ids)
+        self._lexical.add(texts)
+        self._rows += len(chunk_ids)
+
+    def _start(self, dim: int) -> None:
+        self._dim = dim
+        # Truncates a staging file left behind by a crashed writer.
+        self._vectors = open(self._staging_path, "wb")
+
+    def _commit(self) -> None:
+        self._vectors.flush()
+        os.fsync(self._vectors.fileno())
+        self._vectors.close()
+        self._vectors = None
+        n_rows = len(self._chunk_ids)
+
+        # Write vectors before ids: readers treat a size mismatch as "no segment".
+        os.replace(self._staging_path, os.path.join(self.path, VECTORS_FILE))
+        if n_rows >= IVF_MIN_ROWS:
+            matrix = np.memmap(
+                os.path.join(self.path, VECTORS_FILE),
+                dtype="<f4",
+                mode="r",
+                shape=(n_rows, self._dim),
+            )
+            save_ivf(self.path, train_ivf(matrix, IVF_NLIST or int(4 * math.sqrt(n_rows))))
+        else:
+            remove_ivf(self.path)
+        _save_bm25(self.path, self._lexical.build())
+        _atomic_write(
+            os.path.join(self.path, CHUNK_IDS_FILE),
+            json.dumps({"dim": self._dim, "chunk_ids": self._chunk_ids}).encode("utf-8"),
+        )
+
+
+def segment_version(docs_snapshot_id: str) -> Optional[Tuple[int, int]]:
+    """Identity (inode, mtime) of the segment's `chunk_ids.json`; None if absent.
+
+    Every commit or removal replaces that file, so a changed identity means a
+    changed segment, including one written by another process.
+    """
+    try:
+        stat = os.stat(os.path.join(segment_dir(docs_snapshot_id), CHUNK_IDS_FILE))
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def open_segment(docs_snapshot_id: str) -> Optional[Segment]:
+    path = segment_dir(docs_snapshot_id)
+    vectors_path = os.path.join(path, VECTORS_FILE)
+    try:
+        with open(os.path.join(path, CHUNK_IDS_FILE), encoding="utf-8") as f:
+            header = json.load(f)
+        size = os.path.getsize(vectors_path)
+    except (OSError, ValueError):
+        return None
+
+    chunk_ids = header.get("chunk_ids") or []
+    dim = int(header.get("dim") or 0)
+    if not chunk_ids or not dim or size != len(chunk_ids) * dim * 4:
+        return None
+    matrix = np.memmap(vectors_path, dtype="<f4", mode="r", shape=(len(chunk_ids), dim))
+    return Segment(
+        chunk_ids=chunk_ids,
+        matrix=matrix,
+        ivf=load_ivf(path, len(chunk_ids), dim),
+        lexical=_load_bm25(path, len(chunk_ids)),
+    )
+
+
+def _save_bm25(path: str, lexical: Bm25Index) -> None:
+    tmp_path = os.path.join(path, f"{BM25_POSTINGS_FILE}.tmp")
+    with open(tmp_path, "wb") as f:
+        np.savez(
+            f,
+            offsets=lexical.offsets,
+            rows=lexical.rows,
+            tfs=lexical.tfs,
+            doc_lens=lexical.doc_lens,
+        )
+    os.replace(tmp_path, os.path.join(path, BM25_POSTINGS_FILE))
+    _atomic_write(
+        os.path.join(path, BM25_TERMS_FILE),
+        json.dumps({"terms": lexical.terms}).encode("utf-8"),
+    )
+
+
+def _load_bm25(path: str, n_rows: int) -> Optional[Bm25Index]:
+    try:
+        with open(os.path.join(path, BM25_TERMS_FILE), encoding="utf-8") as f:
+            terms = json.load(f)["terms"]
+        with np.load(os.path.join(path, BM25_POSTINGS_FILE)) as data:
+            arrays = {name: data[name] for name in ("offsets", "rows", "tfs", "doc_lens")}
+    except (OSError, ValueError, KeyError):
+        return None
+    if arrays["doc_lens"].shape[0] != n_rows or arrays["offsets"].shape[0] != len(terms) + 1:
+        return None
+    return Bm25Index(terms, **arrays)
+
+
+def _remove_segment(path: str) -> None:
+    # Ids first: without them readers treat the snapshot as having no segment.
+    for name in (CHUNK_IDS_FILE, VECTORS_FILE, BM25_POSTINGS_FILE, BM25_TERMS_FILE):
+        try:
+            os.remove(os.path.join(path, name))
+        except FileNotFoundError:
+            pass
+    remove_ivf(path)
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
@@ -0,0 +1,83 @@
+"""Cached "current snapshot" pointer for /v1/ask requests without a snapshot."""
+
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+from .config import DATA_DIR
+from .db import get_latest_docs_snapshot_id, load_snapshot_doc_ids
+
+POINTER_FILE = os.path.join(DATA_DIR, "latest_snapshot")
+
+_Version = Tuple[int, int]
+
+_cached: Optional[Tuple[_Version, Optional[str]]] = None
+_lock = threading.Lock()
+# docs_snapshot_id -> its document ids, valid while the pointer is unchanged.
+_contents: Dict[str, str] = {}
+_contents_version: Optional[_Version] = None
+
+
+def latest_docs_snapshot_id() -> Optional[str]:
+    version = _pointer_version()
+    if version is None:
+        # First reader on this host: publish a pointer so later reads can be
+        # validated, then fall through to the DB.
+        version = _write_pointer("")
+    with _lock:
+        if _cached is not None and _cached[0] == version:
+            return _cached[1]
+    docs_snapshot_id = get_latest_docs_snapshot_id()
+    _store(version, docs_snapshot_id)
+    return docs_snapshot_id
+
+
+def content_id(docs_snapshot_id: str) -> str:
+    """The document ids currently in a snapshot; changes whenever it is re-ingested."""
+    global _contents_version
+    version = _pointer_version() or _write_pointer("")
+    with _lock:
+        if _contents_version != version:
+            _contents.clear()
+            _contents_version = version
+        cached = _contents.get(docs_snapshot_id)
+    if cached is not None:
+        return cached
+    content = ",".join(sorted(load_snapshot_doc_ids(docs_snapshot_id)))
+    with _lock:
+        if _contents_version == version:
+            _contents[docs_snapshot_id] = content
+    return content
+
+
+def mark_ingested(docs_snapshot_id: str) -> None:
+    """Record a completed ingest; every worker re-resolves on its next read."""
+    _store(_write_pointer(docs_snapshot_id), docs_snapshot_id)
+
+
+def _store(version: _Version, docs_snapshot_id: Optional[str]) -> None:
+    global _cached
+    with _lock:
+        _cached = (version, docs_snapshot_id)
+
+
+def _pointer_version() -> Optional[_Version]:
+    try:
+        stat = os.stat(POINTER_FILE)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def _write_pointer(docs_snapshot_id: str) -> _Version:
+    # A fresh file per write changes the inode even within one mtime tick.
+    os.makedirs(DATA_DIR, exist_ok=True)
+    tmp_path = f"{POINTER_FILE}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(docs_snapshot_id)
+        f.flush()
+        stat = os.fstat(f.fileno())
+    os.replace(tmp_path, POINTER_FILE)
+    # Taken from our own file, so a concurrent writer's pointer never gets
+    # paired with this value.
+    return stat.st_ino, stat.st_mtime_ns
@@ -1,7 +1,23 @@
-from datetime import datetime, timedelta, timezone
-from typing import Dict, List
+import json
+import queue
+import threading
+import time
+from typing import Dict, List, Optional
 
-from .db import Telemetry, insert_telemetry, load_telemetry
+from . import metrics
+from .config import (
+    TELEMETRY_FLUSH_INTERVAL_MS,
+    TELEMETRY_FLUSH_ROWS,
+    TELEMETRY_QUEUE_SIZE,
+)
+from .db import insert_telemetry_rows
+
+_queue: "queue.Queue[Dict]" = queue.Queue(maxsize=max(TELEMETRY_QUEUE_SIZE, 1))
+_stop = threading.Event()
+_flusher: Optional[threading.Thread] = None
+_flusher_lock = threading.Lock()
+_dropped = 0
+_dropped_lock = threading.Lock()
 
 
 def record_telemetry(
@@ -20,98 +36,100 @@ def record_telemetry(
     cache_hit: bool,
     refusal_code: str | None,
     failure_label: str | None,
+    stage_latency_ms: Dict[str, float] | None = None,
 ) -> None:
-    insert_telemetry(
-        Telemetry(
-            request_id=request_id,
-            docs_snapshot_id=docs_snapshot_id,
-            prompt_version=prompt_version,
-            retrieval_version=retrieval_version,
-            model_id=model_id,
-            parser_mode=parser_mode,
-            timestamp_utc=timestamp_utc,
-            latency_ms=latency_ms,
-            tokens_in=tokens_in,
-            tokens_out=tokens_out,
-            cost_est=cost_est,
-            cache_hit=cache_hit,
-            refusal_code=refusal_code,
-            failure_label=failure_label,
-        )
-    )
-
-
-def load_window_telemetry(hours: int = 24, limit: int = 500) -> List[Dict]:
-    rows = load_telemetry(hours=hours, limit=limit)
-    return [
-        {
-            "request_id": row.request_id,
-            "docs_snapshot_id": row.docs_snapshot_id,
-            "prompt_version": row.prompt_version,
-            "retrieval_version": row.retrieval_version,
-            "model_id": row.model_id,
-            "parser_mode": row.parser_mode,
-            "timestamp_utc": row.timestamp_utc,
-            "latency_ms": row.latency_ms,
-            "tokens_in": row.tokens_in,
-            "tokens_out": row.tokens_out,
-            "cost_est": row.cost_est,
-            "cache_hit": row.cache_hit,
-            "refusal_code": row.refusal_code,
-            "failure_label": row.failure_label,
-        }
-        for row in rows
-    ]
-
-
-def compute_metrics(rows: List[Dict]) -> Dict:
-    if not rows:
-        now = datetime.now(timezone.utc).isoformat()
-        return {
-            "window_start_utc": now,
-            "window_end_utc": now,
-            "p50_latency_ms": 0,
-            "p95_latency_ms": 0,
-            "avg_cost_per_query": 0.0,
-            "refusals_by_code": {},
-            "cache_hit_rate": 0.0,
-        }
-
-    latencies = sorted(row["latency_ms"] for row in rows)
-    p50 = _percentile(latencies, 50)
-    p95 = _percentile(latencies, 95)
-    avg_cost = sum(row["cost_est"] for row in rows) / len(rows)
-    refusal_counts = {}
-    cache_hits = 0
-    for row in rows:
-        if row["refusal_code"]:
-            refusal_counts[row["refusal_code"]] = refusal_counts.get(
-                row["refusal_code"], 0
-            ) + 1
-        if row["cache_hit"]:
-            cache_hits += 1
-
-    window_end = rows[0]["timestamp_utc"]
-    window_start = rows[-1]["timestamp_utc"]
-    return {
-        "window_start_utc": window_start,
-        "window_end_utc": window_end,
-        "p50_latency_ms": p50,
-        "p95_latency_ms": p95,
-        "avg_cost_per_query": round(avg_cost, 6),
-        "refusals_by_code": refusal_counts,
-        "cache_hit_rate": round(cache_hits / len(rows), 4),
+    row = {
+        "request_id": request_id,
+        "docs_snapshot_id": docs_snapshot_id,
+        "prompt_version": prompt_version,
+        "retrieval_version": retrieval_version,
+        "model_id": model_id,
+        "parser_mode": parser_mode,
+        "timestamp_utc": timestamp_utc,
+        "latency_ms": latency_ms,
+        "tokens_in": tokens_in,
+        "tokens_out": tokens_out,
+        "cost_est": cost_est,
+        "cache_hit": cache_hit,
+        "refusal_code": refusal_code,
+        "failure_label": failure_label,
+        "stage_latency_json": json.dumps(stage_latency_ms or {}),
     }
+    _ensure_flusher()
+    try:
+        _queue.put_nowait(row)
+    except queue.Full:
+        _count_dropped(1)
+
+
+def record_stages(kind: str, stages_ms: Dict[str, float]) -> None:
+    """Fold an upload's or ingest job's stage timings into the rolling metrics."""
+    metrics.record_stages(kind, stages_ms)
+    _ensure_flusher()
+
+
+def dropped_events() -> int:
+    with _dropped_lock:
+        return _dropped
+
+
+def shutdown_telemetry(timeout_s: float = 10.0) -> None:
+    """Flush queued records and stop the flush thread."""
+    global _flusher
+    with _flusher_lock:
+        flusher, _flusher = _flusher, None
+    if flusher is None:
+        return
+    _stop.set()
+    flusher.join(timeout_s)
+    _stop.clear()
+
+
+def _ensure_flusher() -> None:
+    global _flusher
+    if _flusher is not None:
+        return
+    with _flusher_lock:
+        if _flusher is None:
+            _flusher = threading.Thread(
+                target=_flush_loop, name="telemetry-flush", daemon=True
+            )
+            _flusher.start()
+
+
+def _flush_loop() -> None:
+    interval_s = max(TELEMETRY_FLUSH_INTERVAL_MS, 1) / 1000
+    batch_rows = max(TELEMETRY_FLUSH_ROWS, 1)
+    while True:
+        stopping = _stop.is_set()
+        batch: List[Dict] = []
+        deadline = time.monotonic() + interval_s
+        while len(batch) < batch_rows:
+            timeout = deadline - time.monotonic()
+            try:
+                # Once stopping, take what is queued without waiting.
+                row = _queue.get_nowait() if stopping else _queue.get(timeout=max(timeout, 0))
+            except queue.Empty:
+                break
+            batch.append(row)
+        if batch:
+            _write_batch(batch)
+        metrics.persist()
+        if stopping and not batch:
+            return
+
+
+def _write_batch(batch: List[Dict]) -> None:
+    try:
+        insert_telemetry_rows(batch)
+    except Exception as e:  # noqa: BLE001 - telemetry must not break the API
+        print(f"Warning: Dropped {len(batch)} telemetry records: {e}")
+        _count_dropped(len(batch))
+    # Aggregates count every request, even when its row could not be stored.
+    metrics.record(batch)
 
 
-def _percentile(values: List[int], pct: int) -> int:
-    if not values:
-        return 0
-    k = (len(values) - 1) * (pct / 100)
-    f = int(k)
-    c = min(f + 1, len(values) - 1)
-    if f == c:
-        return values[f]
-    d0 = values[f] * (c - k)
-    d1 = values[c] * (k - f)
-    return int(d0 + d1)
+def _count_dropped(count: int) -> None:
+    global _dropped
+    with _dropped_lock:
+        _dropped += count
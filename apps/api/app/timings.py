@@ -0,0 +1,74 @@
+"""Per-stage wall-clock timing for /v1/ask, uploads and ingestion jobs."""
+
+import contextlib
+import time
+from contextvars import ContextVar
+from typing import Dict, Iterable, Iterator, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class StageTimer:
+    def __init__(self) -> None:
+        self.stages_ms: Dict[str, float] = {}
+        self._stack: List[List] = []
+
+    def enter(self, name: str) -> None:
+        now = time.perf_counter()
+        if self._stack:
+            self._charge(self._stack[-1], now)
+        self._stack.append([name, now])
+
+    def exit(self) -> None:
+        now = time.perf_counter()
+        self._charge(self._stack.pop(), now)
+        if self._stack:
+            self._stack[-1][1] = now
+
+    def rounded(self) -> Dict[str, float]:
+        return {name: round(ms, 3) for name, ms in self.stages_ms.items()}
+
+    def _charge(self, frame: List, now: float) -> None:
+        name, started = frame
+        self.stages_ms[name] = self.stages_ms.get(name, 0.0) + (now - started) * 1000
+
+
+_timer: ContextVar[Optional[StageTimer]] = ContextVar("stage_timer", default=None)
+
+
+@contextlib.contextmanager
+def collect() -> Iterator[StageTimer]:
+    timer = StageTimer()
+    token = _timer.set(timer)
+    try:
+        yield timer
+    finally:
+        _timer.reset(token)
+
+
+def current() -> Optional[StageTimer]:
+    return _timer.get()
+
+
+@contextlib.contextmanager
+def stage(name: str) -> Iterator[None]:
+    timer = _timer.get()
+    if timer is None:
+        yield
+        return
+    timer.enter(name)
+    try:
+        yield
+    finally:
+        timer.exit()
+
+
+def timed_iter(name: str, items: Iterable[T]) -> Iterator[T]:
+    iterator = iter(items)
+    while True:
+        with stage(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
@@ -2,6 +2,8 @@
 
 import React, { useRef, useState } from "react";
 
+const JOB_POLL_INTERVAL_MS = 1000;
+
 type IngestionZoneProps = {
   onUploadSuccess: (snapshotId: string, fileName: string) => void;
   apiUrl: string;
@@ -25,7 +27,15 @@ export function IngestionZone({ onUploadSuccess, apiUrl }: IngestionZoneProps) {
         body: formData,
       });
       if (!res.ok) throw new Error("Upload failed");
-      const data = await res.json();
+      let data = await res.json();
+      // 202: ingestion runs in the background; poll until the job settles.
+      while (data.status === "queued" || data.status === "running") {
+        await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+        const jobRes = await fetch(`${apiUrl}/v1/docs/jobs/${data.job_id}`);
+        if (!jobRes.ok) throw new Error("Job status failed");
+        data = await jobRes.json();
+      }
+      if (data.status === "failed") throw new Error(data.error || "Ingestion failed");
       onUploadSuccess(data.docs_snapshot_id, file.name);
     } catch (err) {
       console.error(err);
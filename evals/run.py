@@ -1,16 +1,31 @@
 import argparse
+import asyncio
+import itertools
 import json
 import os
+import random
+import ssl
 import time
+import urllib.parse
 import urllib.request
+from collections import Counter
 from datetime import datetime, timezone
 from pathlib import Path
+from typing import Iterator
 
 
 def main() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument("--suite", default="golden")
     parser.add_argument("--api-url", default=os.getenv("EVAL_API_URL", "http://localhost:8000"))
+    load = parser.add_argument_group("load mode (enabled by --duration)")
+    load.add_argument("--duration", type=float, default=0.0, help="Seconds to run; 0 runs the evals.")
+    load.add_argument("--concurrency", type=int, default=8, help="Concurrent connections.")
+    load.add_argument("--rps", type=float, default=0.0, help="Target requests/s; 0 sends as fast as possible.")
+    load.add_argument("--synthetic", action="store_true", help="Generate questions instead of replaying the suite.")
+    load.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds.")
+    load.add_argument("--seed", type=int, default=0)
+    load.add_argument("--report", default="evals/out/load.json")
     args = parser.parse_args()
 
     suite_path = Path("evals") / f"{args.suite}.jsonl"
@@ -21,6 +36,15 @@ def main() -> None:
     out_dir = Path("evals/out")
     out_dir.mkdir(parents=True, exist_ok=True)
 
+    if args.duration > 0:
+        questions = _synthetic_questions(cases, args.seed) if args.synthetic else itertools.cycle(cases)
+        report = asyncio.run(_run_load(args, questions))
+        report_path = Path(args.report)
+        report_path.parent.mkdir(parents=True, exist_ok=True)
+        report_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(json.dumps(report["metrics"], indent=2))
+        return
+
     details_path = out_dir / "details.jsonl"
     summary_path = out_dir / "summary.json"
 
@@ -128,6 +152,174 @@ def _call_ask(api_url: str, case: dict) -> dict:
         return json.loads(resp.read().decode("utf-8"))
 
 
+async def _run_load(args: argparse.Namespace, questions: Iterator[dict]) -> dict:
+    """Replay cases against /v1/ask for `args.duration` seconds.
+
+    With `--rps`, request i is due at start + i / rps (open loop) and its
+    latency is measured from that due time, so queueing behind a slow server
+    is counted instead of hidden by the client waiting.
+    """
+    concurrency = max(args.concurrency, 1)
+    started = time.perf_counter()
+    deadline = started + args.duration
+    tickets = itertools.count()
+    samples: list[dict] = []
+    versions: dict = {}
+
+    async def worker() -> None:
+        client = _AsyncClient(args.api_url)
+        try:
+            while True:
+                ticket = next(tickets)
+                due = started + ticket / args.rps if args.rps > 0 else time.perf_counter()
+                if due >= deadline:
+                    return
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                case = next(questions)
+                payload = {"question": case["question"], "docs_snapshot_id": case.get("docs_snapshot_id")}
+                status, body, error = 0, {}, None
+                try:
+                    status, raw = await asyncio.wait_for(client.post_json("/v1/ask", payload), args.timeout)
+                    body = json.loads(raw) if status < 400 else {}
+                except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as exc:
+                    error = type(exc).__name__
+                    await client.close()
+                if status >= 400:
+                    error = f"HTTP_{status}"
+                if not versions and body.get("version_snapshot"):
+                    versions.update(body["version_snapshot"])
+                samples.append(
+                    {
+                        "latency_ms": int((time.perf_counter() - due) * 1000),
+                        "error": error,
+                        "refusal_code": body.get("refusal_code"),
+                    }
+                )
+        finally:
+            await client.close()
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed_s = time.perf_counter() - started
+
+    ok = [s for s in samples if s["error"] is None]
+    latencies = [s["latency_ms"] for s in ok]
+    refusals = Counter(s["refusal_code"] for s in ok if s["refusal_code"])
+    total = len(samples)
+    return {
+        "run_id": datetime.now(timezone.utc).isoformat(),
+        "suite": "synthetic" if args.synthetic else args.suite,
+        "mode": "load",
+        "prompt_version": versions.get("prompt_version"),
+        "retrieval_version": versions.get("retrieval_version"),
+        "model_id": versions.get("model_id"),
+        "parser_mode": versions.get("parser_mode"),
+        "docs_snapshot_id": versions.get("docs_snapshot_id"),
+        "config": {
+            "api_url": args.api_url,
+            "concurrency": concurrency,
+            "duration_s": args.duration,
+            "rps": args.rps,
+            "timeout_s": args.timeout,
+            "seed": args.seed,
+        },
+        "metrics": {
+            "requests": total,
+            "elapsed_s": round(elapsed_s, 3),
+            "throughput_rps": round(len(ok) / elapsed_s, 2) if elapsed_s else 0.0,
+            "p50_latency_ms": _percentile(latencies, 50),
+            "p95_latency_ms": _percentile(latencies, 95),
+            "p99_latency_ms": _percentile(latencies, 99),
+            "max_latency_ms": max(latencies, default=0),
+            "error_rate": round((total - len(ok)) / total, 4) if total else 0.0,
+            "errors_by_type": dict(Counter(s["error"] for s in samples if s["error"])),
+            "refusal_rate": round(sum(refusals.values()) / len(ok), 4) if ok else 0.0,
+            "refusals_by_code": dict(refusals),
+        },
+    }
+
+
+def _synthetic_questions(cases: list, seed: int) -> Iterator[dict]:
+    # Distinct questions drawn from the suite's vocabulary, so the query cache
+    # does not absorb the load; docs_snapshot_id is left to the API default.
+    rng = random.Random(seed)
+    words = sorted(
+        {w.strip("?.,!\"'").lower() for case in cases for w in case["question"].split()} - {""}
+    )
+    for i in itertools.count():
+        picked = rng.sample(words, min(len(words), rng.randint(3, 8)))
+        yield {"question": f"{' '.join(picked)} {i}?"}
+
+
+class _AsyncClient:
+    """Minimal HTTP/1.1 keep-alive client on asyncio streams (stdlib only)."""
+
+    def __init__(self, api_url: str) -> None:
+        parts = urllib.parse.urlsplit(api_url)
+        self._https = parts.scheme == "https"
+        self._host = parts.hostname or "localhost"
+        self._port = parts.port or (443 if self._https else 80)
+        self._prefix = parts.path.rstrip("/")
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+
+    async def post_json(self, path: str, payload: dict) -> tuple[int, bytes]:
+        body = json.dumps(payload).encode("utf-8")
+        head = (
+            f"POST {self._prefix}{path} HTTP/1.1\r\n"
+            f"Host: {self._host}:{self._port}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n"
+        ).encode("ascii")
+        reused = self._writer is not None
+        try:
+            return await self._send(head + body)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            await self.close()
+            if not reused:
+                raise
+            # The server closed an idle keep-alive connection; retry once.
+            return await self._send(head + body)
+
+    async def close(self) -> None:
+        writer, self._reader, self._writer = self._writer, None, None
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+    async def _send(self, request: bytes) -> tuple[int, bytes]:
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(
+                self._host, self._port, ssl=ssl.create_default_context() if self._https else None
+            )
+        self._writer.write(request)
+        await self._writer.drain()
+
+        status_line = await self._reader.readline()
+        if not status_line:
+            raise ConnectionError("Connection closed before response")
+        status = int(status_line.split()[1])
+        headers = {}
+        while (line := await self._reader.readline()) not in (b"\r\n", b"\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            body = b""
+            while size := int((await self._reader.readline()).split(b";")[0], 16):
+                body += await self._reader.readexactly(size + 2)
+                body = body[:-2]
+            await self._reader.readline()
+        else:
+            body = await self._reader.readexactly(int(headers.get("content-length", "0")))
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+        return status, body
+
+
 def _percentile(values: list[int], pct: int) -> int:
     if not values:
         return 0